@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Purpose: Benchmark IntelligentComplianceScanner scan and remediation on a synthetic manifest corpus.
+- Builds a corpus from manifests/examples/compliant.yaml and noncompliant.yaml at each --sizes document count,
+  with --density of the documents drawn from the noncompliant seed (deterministic for a given --seed).
+- Each size runs in a fresh interpreter so peak RSS is per size; reports scan docs/s, peak RSS and
+  auto_remediate time as JSON for comparison across versions.
+
+Usage:
+  python3 scripts/bench_scanner.py --sizes 1000,10000,100000 --density 0.2 --out artifacts/bench/scanner.json
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCANNER_PATH = REPO_ROOT / "skills" / "compliance-automation" / "intelligent-scanner.py"
+
+
+def load_scanner_module():
+    """Import the hyphenated scanner script; registered in sys.modules so worker processes can unpickle it."""
+    spec = importlib.util.spec_from_file_location("intelligent_scanner", SCANNER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_corpus(examples_dir: Path, out_dir: Path, documents: int, density: float,
+                 docs_per_file: int, seed: int) -> int:
+    """Write documents manifests into out_dir, docs_per_file per file; return the noncompliant count."""
+    seeds = {}
+    for name in ("compliant", "noncompliant"):
+        text = (examples_dir / f"{name}.yaml").read_text(encoding="utf-8").strip("\n")
+        seeds[name] = text.replace(f"name: {name}\n", f"name: {name}-{{n}}\n", 1)
+    rng = random.Random(seed)
+    noncompliant = 0
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for start in range(0, documents, docs_per_file):
+        docs = []
+        for n in range(start, min(start + docs_per_file, documents)):
+            bad = rng.random() < density
+            noncompliant += bad
+            docs.append(seeds["noncompliant" if bad else "compliant"].replace("{n}", str(n)))
+        (out_dir / f"bench-{start // docs_per_file:06d}.yaml").write_text("\n---\n".join(docs) + "\n", encoding="utf-8")
+    return noncompliant
+
+
+def peak_rss_mb(who: int) -> float:
+    """ru_maxrss is KiB on Linux and bytes on macOS."""
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_one(args) -> dict:
+    """Benchmark a single corpus size in this process."""
+    scanner_module = load_scanner_module()
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="bench-scanner-") as tmp:
+        corpus = Path(args.corpus_dir or tmp) / f"corpus-{args.run_one}"
+        noncompliant = build_corpus(Path(args.examples), corpus, args.run_one, args.density,
+                                    args.docs_per_file, args.seed)
+        scanner = scanner_module.IntelligentComplianceScanner(
+            manifests_dir=str(corpus), rules_dir=str(SCANNER_PATH.parent), workers=args.workers)
+
+        start = time.perf_counter()
+        violations = scanner.scan_manifests()
+        scan_seconds = time.perf_counter() - start
+
+        result = {
+            "documents": args.run_one,
+            "files": len(scanner.scanned_files),
+            "noncompliant_documents": noncompliant,
+            "density": args.density,
+            "workers": scanner.workers,
+            "scan": {
+                "seconds": round(scan_seconds, 4),
+                "docs_per_second": round(args.run_one / scan_seconds, 1) if scan_seconds else None,
+                "violations": len(violations),
+                "check_timings": scanner.check_timings(),
+            },
+        }
+        if not args.skip_remediation:
+            start = time.perf_counter()
+            fixes = scanner.auto_remediate(violations)
+            result["remediation"] = {"seconds": round(time.perf_counter() - start, 4), "fixes_applied": len(fixes)}
+        del violations
+        result["peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_SELF)
+        result["peak_rss_children_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "-C", str(REPO_ROOT), "rev-parse", "--short", "HEAD"],
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    """CLI entrypoint: run each size in a child interpreter and emit a JSON report."""
+    ap = argparse.ArgumentParser(description="Benchmark compliance scan and remediation throughput")
+    ap.add_argument("--examples", default=str(REPO_ROOT / "manifests" / "examples"), help="Directory holding the seed manifests")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated document counts")
+    ap.add_argument("--density", type=float, default=0.2, help="Fraction of documents drawn from noncompliant.yaml")
+    ap.add_argument("--docs-per-file", type=int, default=10, help="Documents per generated multi-document file")
+    ap.add_argument("--workers", type=int, default=1, help="Scanner worker processes (0 = all cores)")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus RNG seed")
+    ap.add_argument("--skip-remediation", action="store_true", help="Only measure the scan")
+    ap.add_argument("--corpus-dir", default=None, help="Generate corpora here instead of a temporary directory")
+    ap.add_argument("--out", default=None, help="Optional JSON output path")
+    ap.add_argument("--run-one", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run_one is not None:
+        print(json.dumps(run_one(args)))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        proc = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--run-one", str(size)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"benchmark for {size} documents failed")
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(f"{size} docs: {results[-1]['scan']['docs_per_second']} docs/s", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
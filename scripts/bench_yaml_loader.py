@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Purpose: Benchmark YAML parse time of the pure-Python SafeLoader against the libyaml CSafeLoader.
+- Builds an in-memory multi-document corpus by repeating manifests/examples/*.yaml --scale times.
+- Parses the corpus --repeat times with each loader and reports the best wall time and docs/s as JSON.
+
+Usage:
+  python3 scripts/bench_yaml_loader.py --scale 2000 --repeat 3 --out artifacts/bench/yaml-loader.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+
+def build_corpus(examples_dir: Path, scale: int) -> str:
+    """Concatenate example manifests into one multi-document YAML stream, repeated scale times."""
+    docs = [p.read_text(encoding="utf-8").strip("\n") for p in sorted(examples_dir.glob("*.yaml"))]
+    if not docs:
+        raise SystemExit(f"no *.yaml examples under {examples_dir}")
+    return "\n---\n".join(docs * scale) + "\n"
+
+
+def time_loader(loader, corpus: str, repeat: int) -> dict:
+    """Return best-of-repeat parse time and document count for one loader."""
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in yaml.load_all(corpus, Loader=loader))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"loader": loader.__name__, "documents": count, "seconds": round(best, 4),
+            "docs_per_second": round(count / best, 1) if best else None}
+
+
+def main():
+    """CLI entrypoint: run the loader comparison and emit a JSON report."""
+    ap = argparse.ArgumentParser(description="Compare SafeLoader and CSafeLoader parse time")
+    ap.add_argument("--examples", default="manifests/examples", help="Directory of seed manifests")
+    ap.add_argument("--scale", type=int, default=1000, help="Times to repeat the seed manifests")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing runs per loader (best is reported)")
+    ap.add_argument("--out", default=None, help="Optional JSON output path")
+    args = ap.parse_args()
+
+    corpus = build_corpus(Path(args.examples), args.scale)
+    results = [time_loader(yaml.SafeLoader, corpus, args.repeat)]
+    if hasattr(yaml, "CSafeLoader"):
+        results.append(time_loader(yaml.CSafeLoader, corpus, args.repeat))
+    else:
+        print("libyaml not available; only SafeLoader measured.", file=sys.stderr)
+
+    report = {"corpus_bytes": len(corpus.encode("utf-8")), "scale": args.scale, "results": results}
+    if len(results) == 2 and results[1]["seconds"]:
+        report["speedup"] = round(results[0]["seconds"] / results[1]["seconds"], 2)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,8 @@ except Exception as e:
     print("FATAL: PyYAML not available; please ensure 'python3 -m pip install pyyaml' before running.", file=sys.stderr)
     sys.exit(2)
 
+from yaml_loader import safe_load
+
 # ---------- Helpers ----------
 
 def sha256_of(path: str) -> str:
@@ -98,7 +100,7 @@ def parse_args():
 def load_inputs(path: str) -> dict:
     """Load YAML required inputs."""
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return safe_load(f)
 
 def verify_with_checksums_file(binary_path: str, checksums_path: str, expected_filename: str = None) -> bool:
     """
@@ -5,6 +5,7 @@ Usage:
   openapi_patch.py --in openapi.yaml --out openapi.patched.yaml --contact "Ops <ops@example.com>" --license "Apache-2.0" --version "1.0.1"
 """
 import argparse, sys, json, yaml, os
+from yaml_loader import safe_load
 
 def main():
   p = argparse.ArgumentParser()
@@ -18,7 +19,7 @@ def main():
   with open(args.inp, "r") as f:
     # try YAML first
     try:
-      doc = yaml.safe_load(f)
+      doc = safe_load(f)
     except Exception:
       f.seek(0); doc = json.load(f)
 
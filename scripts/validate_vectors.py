@@ -19,6 +19,8 @@ except Exception as e:
   print("PyYAML not installed. Please install pyyaml.", file=sys.stderr)
   sys.exit(2)
 
+from yaml_loader import safe_load
+
 try:
   import jsonschema
   from jsonschema import Draft202012Validator
@@ -41,7 +43,7 @@ def hash_dual(data: bytes) -> Dict[str, str]:
 def load_yaml(path: Path) -> Any:
   """Load YAML file into Python object."""
   with path.open("r", encoding="utf-8") as f:
-    return yaml.safe_load(f)
+    return safe_load(f)
 
 
 def list_modules(modules_root: Path) -> List[Path]:
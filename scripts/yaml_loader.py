@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Purpose: Shared YAML loading helpers for repository tools.
+- Uses the libyaml C loader (yaml.CSafeLoader) when PyYAML was built with it, otherwise falls back to the pure-Python SafeLoader.
+- Semantics are identical to yaml.safe_load / yaml.safe_load_all; only parse speed differs.
+"""
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+HAS_LIBYAML = SafeLoader is not yaml.SafeLoader
+
+
+def safe_load(stream):
+    """Parse the first YAML document in stream."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def safe_load_all(stream):
+    """Parse all YAML documents in stream (lazy generator)."""
+    return yaml.load_all(stream, Loader=SafeLoader)
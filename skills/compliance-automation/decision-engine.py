@@ -4,76 +4,405 @@
 关键功能：故障模式识别、优先级计算、预测性阻塞检测
 """
 
+import heapq
 import json
 import yaml
 import re
+import sqlite3
+import time
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+
+class PatternWindows:
+    """故障模式的滚动窗口计数（1h/24h/7d）与指数衰减频率；小时桶与衰减分数以行存于 SQLite，
+    增量经 UPSERT 原子累加（同 pattern_counts），多个引擎共用同一数据库时不会互相覆盖"""
+
+    BUCKET_SECONDS = 3600
+    # 7 天 + 1 个桶：最老的桶按当前小时已过去的比例折算（滑动窗口近似）
+    BUCKETS = 7 * 24 + 1
+    WINDOWS = {"1h": 1, "24h": 24, "7d": 7 * 24}
+    HALF_LIFE = 24 * 3600
+    VERSION = 2
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pattern_buckets (
+            pattern TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (pattern, bucket)
+        );
+        CREATE TABLE IF NOT EXISTS pattern_scores (
+            pattern TEXT PRIMARY KEY,
+            score REAL NOT NULL,
+            at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.conn.executescript(self.SCHEMA)
+        self.conn.create_function("decay", 1, self._decay, deterministic=True)
+
+    @classmethod
+    def _decay(cls, seconds: float) -> float:
+        return 0.5 ** (seconds / cls.HALF_LIFE)
+
+    def add_many(self, events: Iterable[Tuple[str, float]], now: Optional[float] = None):
+        """在调用方事务内记入 (模式, epoch 秒) 故障事件，并清理窗口外的桶"""
+        now = time.time() if now is None else now
+        oldest = int(now // self.BUCKET_SECONDS) - self.BUCKETS
+        buckets: Counter = Counter()
+        # 本批事件先合并为每个模式一个 (衰减到 at 的分数, at)，再与库中分数合并
+        scores: Dict[str, Tuple[float, float]] = {}
+        for pattern, at in events:
+            bucket = int(at // self.BUCKET_SECONDS)
+            if bucket > oldest:
+                buckets[(pattern, bucket)] += 1
+            score, latest = scores.get(pattern, (0.0, at))
+            if at >= latest:
+                scores[pattern] = (score * self._decay(at - latest) + 1, at)
+            else:
+                scores[pattern] = (score + self._decay(latest - at), latest)
+        self.conn.executemany(
+            "INSERT INTO pattern_buckets (pattern, bucket, count) VALUES (?, ?, ?) "
+            "ON CONFLICT(pattern, bucket) DO UPDATE SET count = count + excluded.count",
+            [(pattern, bucket, n) for (pattern, bucket), n in buckets.items()])
+        self.conn.executemany(
+            "INSERT INTO pattern_scores (pattern, score, at) VALUES (?, ?, ?) "
+            "ON CONFLICT(pattern) DO UPDATE SET"
+            " score = CASE WHEN excluded.at >= at THEN score * decay(excluded.at - at) + excluded.score"
+            " ELSE score + excluded.score * decay(at - excluded.at) END,"
+            " at = max(at, excluded.at)",
+            [(pattern, score, at) for pattern, (score, at) in scores.items()])
+        self.conn.execute("DELETE FROM pattern_buckets WHERE bucket <= ?", (oldest,))
+
+    def clear(self):
+        self.conn.execute("DELETE FROM pattern_buckets")
+        self.conn.execute("DELETE FROM pattern_scores")
+
+    def counts(self, pattern: str, now: Optional[float] = None) -> Dict[str, float]:
+        """各窗口内的故障次数（滑动窗口近似值）；至多读取 BUCKETS 行"""
+        now = time.time() if now is None else now
+        bucket = int(now // self.BUCKET_SECONDS)
+        elapsed = (now % self.BUCKET_SECONDS) / self.BUCKET_SECONDS
+        slots = dict(self.conn.execute(
+            "SELECT bucket, count FROM pattern_buckets WHERE pattern = ? AND bucket > ? AND bucket <= ?",
+            (pattern, bucket - self.BUCKETS, bucket)).fetchall())
+
+        result = {}
+        for name, hours in self.WINDOWS.items():
+            total = sum(slots.get(b, 0) for b in range(bucket - hours + 1, bucket + 1))
+            result[name] = round(total + slots.get(bucket - hours, 0) * (1 - elapsed), 2)
+        return result
+
+    def score(self, pattern: str, now: Optional[float] = None) -> float:
+        """指数衰减频率（半衰期 HALF_LIFE）：刚发生的故障记 1，一天前的记 0.5"""
+        row = self.conn.execute("SELECT score, at FROM pattern_scores WHERE pattern = ?", (pattern,)).fetchone()
+        if row is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return row[0] * self._decay(max(0.0, now - row[1]))
+
+    def snapshot(self, pattern: str, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        return {**self.counts(pattern, now), "decayed": round(self.score(pattern, now), 4)}
+
+
+def _epoch(timestamp: Optional[str]) -> Optional[float]:
+    """ISO 时间戳转 epoch 秒；无法解析时返回 None"""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class HistoryStore:
+    """SQLite 历史存储：结果逐条追加（O(1)），按 issue_type / file_path / timestamp 建索引；
+    故障模式计数与滚动窗口随写入在同一事务内增量维护"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outcomes (
+            id INTEGER PRIMARY KEY,
+            issue_type TEXT,
+            error_type TEXT,
+            file_path TEXT,
+            success INTEGER NOT NULL,
+            time_taken INTEGER,
+            timestamp TEXT NOT NULL,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_outcomes_issue_type ON outcomes(issue_type);
+        CREATE INDEX IF NOT EXISTS idx_outcomes_file_path ON outcomes(file_path);
+        CREATE INDEX IF NOT EXISTS idx_outcomes_timestamp ON outcomes(timestamp);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pattern_counts (
+            pattern TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        );
+    """
+    COLUMNS = ("issue_type", "error_type", "file_path", "success", "time_taken", "timestamp")
+    INSERT = ("INSERT INTO outcomes (issue_type, error_type, file_path, success, time_taken, timestamp, extra) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)")
+    PATTERN_COUNTERS_VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        # 每次提交均落盘；事务由回滚日志保证原子性，崩溃不会留下半写入的历史
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(self.SCHEMA)
+        self.windows = PatternWindows(self.conn)
+        if not self._counters_current():
+            with self._write():
+                # 取得写锁后复查，并发打开旧库时只重建一次
+                if self.get_meta("pattern_counters") != self.PATTERN_COUNTERS_VERSION:
+                    self._rebuild_pattern_counts()
+                if self.get_meta("pattern_windows") != PatternWindows.VERSION:
+                    self._rebuild_pattern_windows()
+
+    def _counters_current(self) -> bool:
+        return (self.get_meta("pattern_counters") == self.PATTERN_COUNTERS_VERSION
+                and self.get_meta("pattern_windows") == PatternWindows.VERSION)
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """BEGIN IMMEDIATE 写事务：先取得写锁，事务内的读取与写回不会被其他连接插入"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    @staticmethod
+    def failure_patterns_of(record: Dict[str, Any]) -> List[str]:
+        """单条结果命中的故障模式（失败记录才计数）"""
+        if record.get("success"):
+            return []
+        patterns = []
+        if (record.get("file_path") or "").endswith(".txt"):
+            patterns.append("double_extension")
+        error_type = (record.get("error_type") or "").lower()
+        if "naming" in error_type:
+            patterns.append("naming_violation")
+        if "dependency" in error_type:
+            patterns.append("dependency_issue")
+        return patterns
+
+    def _insert(self, records: List[Dict[str, Any]]) -> Counter:
+        """写入结果并累加故障模式计数与滚动窗口；调用方负责事务，返回本次计数增量"""
+        self.conn.executemany(self.INSERT, [self._row(record) for record in records])
+        delta = Counter()
+        events = []
+        for record in records:
+            patterns = self.failure_patterns_of(record)
+            delta.update(patterns)
+            at = _epoch(record.get("timestamp"))
+            if at is not None:
+                events.extend((pattern, at) for pattern in patterns)
+        self.conn.executemany(
+            "INSERT INTO pattern_counts (pattern, count) VALUES (?, ?) "
+            "ON CONFLICT(pattern) DO UPDATE SET count = count + excluded.count", delta.items())
+        if events:
+            self.windows.add_many(events)
+        return delta
+
+    def _row(self, record: Dict[str, Any]) -> tuple:
+        extra = {k: v for k, v in record.items() if k not in self.COLUMNS}
+        return (
+            record.get("issue_type"),
+            record.get("error_type"),
+            record.get("file_path"),
+            1 if record.get("success") else 0,
+            record.get("time_taken"),
+            record.get("timestamp") or "",
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条结果并提交"""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """在单个事务中追加多条结果：全部写入或全部不写入"""
+        records = list(records)
+        if not records:
+            return 0
+        with self.conn:
+            self._insert(records)
+            self._set_meta("last_updated", datetime.now().isoformat())
+        return len(records)
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def _set_meta(self, key: str, value: Any):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                          (key, json.dumps(value, ensure_ascii=False)))
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+
+    def query(self, success: Optional[bool] = None, issue_type: Optional[str] = None,
+              file_path: Optional[str] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按索引字段过滤结果；since 为 ISO 时间戳下界"""
+        clauses, params = [], []
+        for column, value in (("issue_type", issue_type), ("file_path", file_path)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if success is not None:
+            clauses.append("success = ?")
+            params.append(1 if success else 0)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(f"SELECT * FROM outcomes{where} ORDER BY id", params).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = {k: row[k] for k in HistoryStore.COLUMNS if row[k] is not None}
+        record["success"] = bool(row["success"])
+        if row["extra"]:
+            record.update(json.loads(row["extra"]))
+        return record
+
+    def failure_patterns(self) -> Dict[str, int]:
+        """读取增量维护的故障模式计数，代价与历史规模无关"""
+        rows = self.conn.execute("SELECT pattern, count FROM pattern_counts WHERE count > 0").fetchall()
+        return {row["pattern"]: row["count"] for row in rows}
+
+    def rebuild_pattern_counts(self):
+        """从 outcomes 全量重建计数（旧库首次打开时执行一次，规则与 failure_patterns_of 一致）"""
+        with self._write():
+            self._rebuild_pattern_counts()
+
+    def _rebuild_pattern_counts(self):
+        row = self.conn.execute(
+            "SELECT SUM(file_path GLOB '*.txt') AS double_extension,"
+            " SUM(lower(error_type) LIKE '%naming%') AS naming_violation,"
+            " SUM(lower(error_type) LIKE '%dependency%') AS dependency_issue"
+            " FROM outcomes WHERE success = 0"
+        ).fetchone()
+        self.conn.execute("DELETE FROM pattern_counts")
+        self.conn.executemany("INSERT INTO pattern_counts (pattern, count) VALUES (?, ?)",
+                              [(name, row[name]) for name in row.keys() if row[name]])
+        self._set_meta("pattern_counters", self.PATTERN_COUNTERS_VERSION)
+
+    def rebuild_pattern_windows(self):
+        """从最近 7 天的失败记录重建滚动窗口（旧库首次打开时执行一次，走 timestamp 索引）"""
+        with self._write():
+            self._rebuild_pattern_windows()
+
+    def _rebuild_pattern_windows(self):
+        since = datetime.now() - timedelta(seconds=PatternWindows.BUCKETS * PatternWindows.BUCKET_SECONDS)
+        events = []
+        for record in self.query(success=False, since=since.isoformat()):
+            at = _epoch(record.get("timestamp"))
+            if at is not None:
+                events.extend((pattern, at) for pattern in self.failure_patterns_of(record))
+        self.windows.clear()
+        self.windows.add_many(events)
+        # 旧版在此键保存整份窗口 JSON；改存表结构版本
+        self._set_meta("pattern_windows", PatternWindows.VERSION)
+
+    def import_legacy_json(self, json_path: Path) -> int:
+        """一次性导入旧版 compliance-history.json，返回导入条数"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        records = [{**record, "success": False} for record in history.get("ci_failures", [])]
+        records += [{**record, "success": True} for record in history.get("remediation_success", [])]
+        with self.conn:
+            self._insert(records)
+            for key in ("failure_patterns", "execution_times", "last_updated"):
+                if key in history:
+                    self._set_meta(key, history[key])
+            self._set_meta("legacy_import", str(json_path))
+        return len(records)
+
+    def close(self):
+        self.conn.close()
+
 
 class DecisionEngine:
-    def __init__(self, history_path: str = "compliance-history.json"):
+    # 基于影响面评分
+    IMPACT_FACTORS = {
+        "blocking_ci": 40,
+        "security_risk": 35,
+        "multiple_files": 25,
+        "frequent_occurrence": 20
+    }
+    # 优先级缓存的有效期：衰减频率在此时间内变化可忽略，记录新结果时立即失效
+    PRIORITY_CACHE_SECONDS = 60
+
+    def __init__(self, history_path: str = "compliance-history.json", db_path: Optional[str] = None):
         self.history_path = Path(history_path)
-        self.history = self._load_history()
+        self.store = self._load_history(db_path)
         self.patterns = self._extract_failure_patterns()
+        # batch() 期间缓冲的结果；None 表示逐条提交
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self._priority_cache: Dict[tuple, int] = {}
+        self._priority_cache_slot: Optional[int] = None
         
-    def _load_history(self) -> Dict[str, Any]:
-        """加载历史合规执行记录"""
-        if self.history_path.exists():
-            with open(self.history_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
-            "ci_failures": [],
-            "remediation_success": [],
-            "failure_patterns": {},
-            "execution_times": {}
-        }
+    def _load_history(self, db_path: Optional[str] = None) -> HistoryStore:
+        """打开历史存储；默认与 history_path 同名的 .db，首次打开时导入旧版 JSON 历史"""
+        if db_path is None:
+            db_path = self.history_path if self.history_path.suffix == ".db" else self.history_path.with_suffix(".db")
+        store = HistoryStore(db_path)
+        if (self.history_path.suffix == ".json" and self.history_path.exists()
+                and store.get_meta("legacy_import") is None):
+            store.import_legacy_json(self.history_path)
+        return store
     
     def _extract_failure_patterns(self) -> Dict[str, Any]:
-        """从历史数据中提取故障模式"""
-        patterns = {}
-        
-        for failure in self.history.get("ci_failures", []):
-            error_type = failure.get("error_type", "")
-            file_path = failure.get("file_path", "")
-            timestamp = failure.get("timestamp", "")
-            
-            # 提取常见模式：双扩展名、命名违规、依赖冲突等
-            if ".txt" in file_path and file_path.endswith(".txt"):
-                patterns["double_extension"] = patterns.get("double_extension", 0) + 1
-            if "naming" in error_type.lower():
-                patterns["naming_violation"] = patterns.get("naming_violation", 0) + 1
-            if "dependency" in error_type.lower():
-                patterns["dependency_issue"] = patterns.get("dependency_issue", 0) + 1
-                
-        return patterns
+        """读取故障模式计数：双扩展名、命名违规、依赖冲突等（由存储增量维护，无需扫描历史）"""
+        return self.store.failure_patterns()
     
     def calculate_priority(self, issue: Dict[str, Any]) -> int:
-        """计算问题修复优先级（0-100分）"""
+        """计算问题修复优先级（0-100分）；评分字段相同的问题只计算一次"""
+        key = (issue.get("type", ""),) + tuple(bool(issue.get(factor, False)) for factor in self.IMPACT_FACTORS)
+        slot = int(time.time() // self.PRIORITY_CACHE_SECONDS)
+        if slot != self._priority_cache_slot:
+            self._priority_cache.clear()
+            self._priority_cache_slot = slot
+        priority = self._priority_cache.get(key)
+        if priority is None:
+            priority = self._priority_cache[key] = self._score_priority(issue)
+        return priority
+    
+    def _score_priority(self, issue: Dict[str, Any]) -> int:
         base_score = 0
         
-        # 基于影响面评分
-        impact_factors = {
-            "blocking_ci": 40,
-            "security_risk": 35,
-            "multiple_files": 25,
-            "frequent_occurrence": 20
-        }
-        
-        for factor, weight in impact_factors.items():
+        for factor, weight in self.IMPACT_FACTORS.items():
             if issue.get(factor, False):
                 base_score += weight
         
-        # 基于历史频率调整
+        # 基于近期频率调整：指数衰减频率，久远的故障几乎不再加分
         issue_type = issue.get("type", "")
-        historical_freq = self.patterns.get(issue_type, 0)
-        if historical_freq > 3:
+        recent_freq = self.store.windows.score(issue_type)
+        if recent_freq > 3:
             base_score += 15
-        elif historical_freq > 1:
+        elif recent_freq > 1:
             base_score += 5
             
         return min(100, base_score)
     
+    def pattern_load(self, pattern: str) -> Dict[str, float]:
+        """故障模式的当前负载：1h/24h/7d 窗口计数与衰减频率"""
+        return self.store.windows.snapshot(pattern)
+    
     def predict_blockers(self, changed_files: List[str]) -> List[Dict[str, Any]]:
         """预测可能引发流水线阻塞的问题"""
         predicted_issues = []
@@ -109,10 +438,16 @@ class DecisionEngine:
                      reverse=True)
     
     def recommend_remediation_strategy(self, issues: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """推荐修复策略"""
-        high_priority = [issue for issue in issues if self.calculate_priority(issue) >= 70]
-        medium_priority = [issue for issue in issues if 40 <= self.calculate_priority(issue) < 70]
-        low_priority = [issue for issue in issues if self.calculate_priority(issue) < 40]
+        """推荐修复策略（单次遍历分桶）"""
+        high_priority, medium_priority, low_priority = [], [], []
+        for issue in issues:
+            priority = self.calculate_priority(issue)
+            if priority >= 70:
+                high_priority.append(issue)
+            elif priority >= 40:
+                medium_priority.append(issue)
+            else:
+                low_priority.append(issue)
         
         strategy = {
             "immediate_actions": high_priority,
@@ -124,8 +459,12 @@ class DecisionEngine:
         
         return strategy
     
+    def top_k(self, issues: Iterable[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """取优先级最高的 k 个问题（堆选择，O(n log k)；同分保持输入顺序）"""
+        return heapq.nlargest(k, issues, key=self.calculate_priority)
+    
     def record_outcome(self, issue: Dict[str, Any], success: bool, time_taken: int):
-        """记录修复结果用于学习"""
+        """记录修复结果用于学习；在 batch() 内时仅缓冲，退出时统一提交"""
         record = {
             "issue_type": issue.get("type"),
             "file_path": issue.get("file_path"),
@@ -134,18 +473,40 @@ class DecisionEngine:
             "timestamp": datetime.now().isoformat()
         }
         
-        if success:
-            self.history["remediation_success"].append(record)
+        if self._pending is not None:
+            self._pending.append(record)
         else:
-            self.history["ci_failures"].append(record)
-            
-        self._save_history()
+            self._commit([record])
+    
+    def _commit(self, records: List[Dict[str, Any]]):
+        """持久化结果并同步内存中的故障模式计数，使优先级立即反映新数据"""
+        self.store.append_many(records)
+        self._priority_cache.clear()
+        for pattern in (p for record in records for p in self.store.failure_patterns_of(record)):
+            self.patterns[pattern] = self.patterns.get(pattern, 0) + 1
+    
+    def record_outcomes(self, outcomes: Iterable[Tuple[Dict[str, Any], bool, int]]) -> None:
+        """批量记录 (issue, success, time_taken)，一次事务提交"""
+        with self.batch():
+            for issue, success, time_taken in outcomes:
+                self.record_outcome(issue, success, time_taken)
+    
+    @contextmanager
+    def batch(self) -> Iterator["DecisionEngine"]:
+        """批量记录的事务上下文：正常退出时一次性原子提交，发生异常则丢弃本批结果；可嵌套"""
+        if self._pending is not None:
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+            pending = self._pending
+        finally:
+            self._pending = None
+        self._commit(pending)
     
-    def _save_history(self):
-        """保存历史数据"""
-        self.history["last_updated"] = datetime.now().isoformat()
-        with open(self.history_path, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, indent=2, ensure_ascii=False)
+    def close(self):
+        self.store.close()
 
 # 使用示例
 if __name__ == "__main__":
@@ -5,31 +5,383 @@
 """
 
 import os
-import yaml
+import sys
+import argparse
+import subprocess
+import fnmatch
+import shutil
 import json
 import re
+import difflib
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Iterator, NamedTuple, Sequence, Tuple, Callable, FrozenSet
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import hashlib
 import logging
+import time
+import asyncio
+import queue
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 共用 scripts/ 下的工具模組（YAML 載入、內容雜湊）與同目錄的修補引擎
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from yaml_loader import SafeLoader, safe_load, safe_load_all  # noqa: E402
+from yaml_patch import YamlPatcher, YamlPatchError, MISSING, parse_path  # noqa: E402
+from violations import (  # noqa: E402
+    PATHS, UNASSIGNED, FileViolations, RemediationType, RiskLevel, Violation, ViolationIndex, ViolationTable,
+    ViolationType, intern_enum
+)
+try:
+    from normalize_and_hash import b3 as content_digest, sha3_512
+except ImportError:
+    def content_digest(data: bytes) -> str: return hashlib.sha256(data).hexdigest()
+    def sha3_512(data: bytes) -> str: return hashlib.sha3_512(data).hexdigest()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RULES_FILENAME = "policy-intelligence-rules.yaml"
+# 檢查邏輯變更時遞增，使既有掃描快取失效
+SCAN_CACHE_VERSION = 4
+# 乾跑修復計畫格式版本
+REMEDIATION_PLAN_VERSION = 1
+DEFAULT_INCLUDE = ("*.yaml", "*.yml")
+
+# 工作負載種類 -> Pod spec 所在路徑；未列出但含 spec.template.spec 的種類沿用預設路徑
+POD_SPEC_PATHS: Dict[str, Tuple[str, ...]] = {
+    'Pod': ('spec',),
+    'Deployment': ('spec', 'template', 'spec'),
+    'StatefulSet': ('spec', 'template', 'spec'),
+    'DaemonSet': ('spec', 'template', 'spec'),
+    'ReplicaSet': ('spec', 'template', 'spec'),
+    'ReplicationController': ('spec', 'template', 'spec'),
+    'Job': ('spec', 'template', 'spec'),
+    'CronJob': ('spec', 'jobTemplate', 'spec', 'template', 'spec'),
+}
+DEFAULT_POD_SPEC_PATH = ('spec', 'template', 'spec')
+CONTAINER_FIELDS = ('containers', 'initContainers', 'ephemeralContainers')
+
+
+def pod_spec_path(kind: Optional[str]) -> Tuple[str, ...]:
+    return POD_SPEC_PATHS.get(kind, DEFAULT_POD_SPEC_PATH)
+
+
+def extract_pod_spec(manifest: Dict) -> Optional[Dict]:
+    """依 kind 取得 Pod spec；非工作負載回傳 None"""
+    node: Any = manifest
+    for key in pod_spec_path(manifest.get('kind')):
+        node = node.get(key) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) else None
+
+
+def iter_containers(pod_spec: Dict) -> Iterator[Tuple[str, int, Dict]]:
+    """單次遍歷所有容器清單，產出 (欄位, 索引, 容器)"""
+    for field in CONTAINER_FIELDS:
+        for i, container in enumerate(pod_spec.get(field) or []):
+            if isinstance(container, dict):
+                yield field, i, container
+
+
+class ComplianceCheck(NamedTuple):
+    """已註冊的合規檢查"""
+    name: str
+    # 適用的 kind；None 表示所有種類（容器檢查僅在能取得 Pod spec 時執行）
+    kinds: Optional[FrozenSet[str]]
+    # True 時逐容器呼叫 fn(scanner, container, rules, file, index, container_index, container_field)，
+    # 否則逐文件呼叫 fn(scanner, manifest, rules, file, index)
+    per_container: bool
+    fn: Callable[..., List[Violation]]
+
+
+CHECK_REGISTRY: List[ComplianceCheck] = []
+
+
+def compliance_check(name: str, kinds: Optional[Sequence[str]] = None, per_container: bool = False):
+    """註冊檢查插件的裝飾器；亦可用於掃描器以外的函數"""
+    def decorator(fn):
+        CHECK_REGISTRY.append(ComplianceCheck(name, frozenset(kinds) if kinds else None, per_container, fn))
+        return fn
+    return decorator
+
+
+class FileRecord(NamedTuple):
+    """檔案清單記錄"""
+    path: Path
+    size: int
+    mtime: float
+
+
+def build_file_inventory(root: Path, include: Sequence[str] = DEFAULT_INCLUDE,
+                         exclude: Sequence[str] = ()) -> List[FileRecord]:
+    """單次 os.scandir 遍歷建立檔案清單；exclude 同時比對相對路徑與檔名，命中的目錄整棵略過"""
+    def _matches(rel: str, name: str, patterns: Sequence[str]) -> bool:
+        return any(fnmatch.fnmatch(rel, pat) or fnmatch.fnmatch(name, pat) for pat in patterns)
+    
+    records = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            logger.warning(f"無法讀取目錄 {directory}: {e}")
+            continue
+        with entries:
+            for entry in entries:
+                path = Path(entry.path)
+                rel = path.relative_to(root).as_posix()
+                if exclude and _matches(rel, entry.name, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif entry.is_file() and _matches(rel, entry.name, include):
+                    st = entry.stat()
+                    records.append(FileRecord(path, st.st_size, st.st_mtime))
+    
+    records.sort(key=lambda r: r.path)
+    return records
+
+
+class ImageMatcher:
+    """鏡像替換規則匹配器：字面規則以字典查找，萬用規則合併為單一交替正則"""
+
+    _REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+    # 數字反向引用 / 命名反向引用 / 條件分組：合併後分組編號位移，須逐條匹配
+    _GROUP_REFERENCE = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?P=|\(\?\(\d)')
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        self.rules = list(rules.values())
+        # 字面規則：re.match 為前綴匹配，故按長度切片後查字典
+        self.literals: Dict[str, int] = {}
+        regex_parts = []
+        self._group_rule: Dict[int, int] = {}
+        # 含分組引用的規則不參與合併，依規則表順序逐條匹配
+        self._sequential: List[Tuple[re.Pattern, int]] = []
+        group = 1
+        for order, pattern in enumerate(rules):
+            if self._REGEX_CHARS.isdisjoint(pattern):
+                self.literals.setdefault(pattern, order)
+                continue
+            if self._GROUP_REFERENCE.search(pattern):
+                self._sequential.append((re.compile(pattern), order))
+                continue
+            self._group_rule[group] = order
+            regex_parts.append(f"({pattern})")
+            group += 1 + re.compile(pattern).groups
+        self.literal_lengths = sorted({len(p) for p in self.literals})
+        self.combined: Optional[re.Pattern] = None
+        try:
+            if regex_parts:
+                self.combined = re.compile('|'.join(regex_parts))
+        except re.error:
+            # 內嵌旗標、重複分組名等無法合併時全部逐條匹配
+            self._sequential = [(re.compile(p), order) for order, p in enumerate(rules)
+                                if not self._REGEX_CHARS.isdisjoint(p)]
+
+    def match(self, image: str) -> Optional[Dict[str, Any]]:
+        """回傳首個（規則表順序）匹配鏡像的替換規則"""
+        best = None
+        for length in self.literal_lengths:
+            if length > len(image):
+                break
+            order = self.literals.get(image[:length])
+            if order is not None and (best is None or order < best):
+                best = order
+        
+        if self.combined is not None:
+            m = self.combined.match(image)
+            if m:
+                # 外層分組最後閉合，lastindex 即命中的規則分組
+                order = self._group_rule[m.lastindex]
+                if best is None or order < best:
+                    best = order
+        for pattern, order in self._sequential:
+            if best is not None and order > best:
+                break
+            if pattern.match(image):
+                best = order
+                break
+        
+        return self.rules[best] if best is not None else None
+
+
+class CompiledRuleSet:
+    """預編譯的智能規則集（每個掃描器或規則檔 mtime 僅建立一次）"""
+
+    def __init__(self, rules: Dict[str, Any], mtime: Optional[float] = None):
+        self.raw = rules
+        self.mtime = mtime
+        # 鏡像替換規則：保留原始順序，以首個匹配為準
+        self.image_matcher = ImageMatcher(rules.get('image_replacement', {}))
+        # 必要命名空間標籤：tuple 保證違規輸出順序，frozenset 用於快速查找
+        self.required_labels = tuple(rules.get('namespace_labeling', {}).get('required_labels', []))
+        self.required_label_set = frozenset(self.required_labels)
+        self.security_context = dict(rules.get('security_context', {}).get('auto_fixes', {}))
+        # 標籤自動生成：{label: (預設值, [(regex, value), ...])}
+        self.label_generators = {
+            label: (spec.get('default'), [(re.compile(p), v) for p, v in spec.get('patterns', {}).items()])
+            for label, spec in rules.get('namespace_labeling', {}).get('auto_generation', {}).items()
+        }
+        # 規則指紋：規則內容或檢查邏輯版本變更時改變
+        self.fingerprint = sha3_512(
+            json.dumps([SCAN_CACHE_VERSION, rules], sort_keys=True, ensure_ascii=False).encode('utf-8')
+        )
+
+    def label_value(self, label: str, namespace: str) -> Optional[str]:
+        """依命名空間名稱推導標籤值；無法推導時回傳 None"""
+        default, patterns = self.label_generators.get(label, (None, []))
+        for pattern, value in patterns:
+            if pattern.match(namespace):
+                return value
+        return default
+
+    def match_image(self, image: str) -> Optional[Dict[str, Any]]:
+        """回傳首個匹配鏡像的替換規則"""
+        return self.image_matcher.match(image)
+
+
+class ScanCache:
+    """持久化掃描快取：檔案內容雜湊 + 規則指紋 -> 違規清單（以 JSON 結構保存）"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == SCAN_CACHE_VERSION:
+                    self.entries = data.get('entries', {})
+            except Exception as e:
+                logger.warning(f"無法載入掃描快取 {self.path}: {e}")
+
+    def get(self, file_path: str, digest: str, fingerprint: str) -> Optional[List[Violation]]:
+        return self.load(file_path) if self.match(file_path, digest, fingerprint) else None
+
+    def match(self, file_path: str, digest: str, fingerprint: str) -> bool:
+        """查詢是否命中並計入統計；命中項以 load() 延後還原，避免預先持有違規物件"""
+        entry = self.entries.get(file_path)
+        if entry and entry['digest'] == digest and entry['rules'] == fingerprint:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def load(self, file_path: str) -> FileViolations:
+        entry = self.entries[file_path]
+        return FileViolations((Violation.from_dict(v) for v in entry['violations']),
+                              entry.get('namespace_teams'))
+
+    def put(self, file_path: str, digest: str, fingerprint: str, violations: List[Violation]):
+        entry = {'digest': digest, 'rules': fingerprint, 'violations': [v.to_dict() for v in violations]}
+        namespace_teams = getattr(violations, 'namespace_teams', None)
+        if namespace_teams:
+            entry['namespace_teams'] = namespace_teams
+        self.entries[file_path] = entry
+        self._dirty = True
+
+    def prune(self, live_paths: List[str]):
+        """移除已不存在檔案的快取項"""
+        live = set(live_paths)
+        for stale in [p for p in self.entries if p not in live]:
+            del self.entries[stale]
+            self._dirty = True
+
+    def save(self):
+        """原子寫入快取檔"""
+        if not self._dirty:
+            return
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCAN_CACHE_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class ShardWriter:
+    """分片 JSONL 寫入：各分片先緩衝於記憶體，達門檻時以附加模式寫出，避免同時開啟大量檔案"""
+
+    def __init__(self, directory: Path, flush_lines: int = 1000):
+        self.directory = Path(directory)
+        self.flush_lines = flush_lines
+        self.files: Dict[str, str] = {}
+        self._buffers: Dict[str, List[str]] = {}
+        self._buffered = 0
+
+    @staticmethod
+    def file_name(shard: str) -> str:
+        """分片檔名；含非安全字元的名稱改寫後附加雜湊以免衝突"""
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', shard).lstrip('.') or '_'
+        if safe != shard:
+            safe += '-' + hashlib.sha1(shard.encode('utf-8')).hexdigest()[:8]
+        return safe + '.jsonl'
+
+    def write(self, shard: str, line: str):
+        if shard not in self.files:
+            self.files[shard] = self.file_name(shard)
+            # 本次執行首次寫入時清空舊內容
+            (self.directory / self.files[shard]).write_text('', encoding='utf-8')
+        self._buffers.setdefault(shard, []).append(line)
+        self._buffered += 1
+        if self._buffered >= self.flush_lines:
+            self.flush()
+
+    def flush(self):
+        for shard, lines in self._buffers.items():
+            with open(self.directory / self.files[shard], 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+        self._buffers = {}
+        self._buffered = 0
+
+
 class IntelligentComplianceScanner:
-    def __init__(self, manifests_dir: str = "manifests", rules_dir: str = "skills/compliance-automation"):
+    def __init__(self, manifests_dir: str = "manifests", rules_dir: str = "skills/compliance-automation",
+                 workers: int = 1, chunk_size: int = 0, cache_path: Optional[str] = None,
+                 changed_files: Optional[List[str]] = None,
+                 include: Sequence[str] = DEFAULT_INCLUDE, exclude: Sequence[str] = (),
+                 async_pipeline: bool = False, read_concurrency: int = 8, queue_size: int = 64):
         self.manifests_dir = Path(manifests_dir)
         self.rules_dir = Path(rules_dir)
-        self.violations = []
+        # workers <= 0 表示使用全部 CPU 核心
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.cache = ScanCache(cache_path) if cache_path else None
+        # 差異掃描範圍：None 表示全量掃描
+        self.changed_files = changed_files
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        # asyncio 管線：讀取 -> 解析 -> 分析，各階段以有界佇列提供背壓
+        self.async_pipeline = async_pipeline
+        self.read_concurrency = max(1, read_concurrency)
+        self.queue_size = max(1, queue_size)
+        # 最近一次掃描的檔案清單與實際掃描範圍，供報告共用
+        self.inventory: List[FileRecord] = []
+        self.scanned_files: List[Path] = []
+        self.violations: List[Violation] = []
         self.fixes_applied = []
+        # 最近一次乾跑產生的修復計畫
+        self.remediation_plan: Optional[Dict[str, Any]] = None
+        self._rule_set: Optional[CompiledRuleSet] = None
+        # 最近一次掃描中 Namespace 宣告的 team 標籤（命名空間 -> team），供分組統計
+        self.namespace_teams: Dict[str, str] = {}
+        # 每項檢查的呼叫次數、耗時與違規數
+        self.check_stats: Dict[str, Dict[str, Any]] = {}
+        self._check_routes: Dict[Optional[str], Tuple[List[ComplianceCheck], List[ComplianceCheck]]] = {}
         
     def load_intelligence_rules(self) -> Dict[str, Any]:
         """載入智能修復規則"""
         rules = {}
         try:
             # 載入鏡像替換規則
-            with open(self.rules_dir / "policy-intelligence-rules.yaml", 'r') as f:
-                rules_data = yaml.safe_load(f)
+            with open(self.rules_dir / RULES_FILENAME, 'r') as f:
+                rules_data = safe_load(f)
                 rules['image_replacement'] = json.loads(rules_data['data']['image-replacement-rules'])
                 rules['namespace_labeling'] = json.loads(rules_data['data']['namespace-labeling-rules'])
                 rules['security_context'] = json.loads(rules_data['data']['security-context-rules'])
@@ -38,192 +390,718 @@ class IntelligentComplianceScanner:
             rules = self._get_fallback_rules()
         return rules
     
-    def scan_manifests(self) -> List[Dict]:
+    def get_rule_set(self) -> CompiledRuleSet:
+        """取得編譯後的規則集；僅在規則檔 mtime 變動時重新載入"""
+        try:
+            mtime = (self.rules_dir / RULES_FILENAME).stat().st_mtime
+        except OSError:
+            mtime = None
+        if self._rule_set is None or self._rule_set.mtime != mtime:
+            self._rule_set = CompiledRuleSet(self.load_intelligence_rules(), mtime)
+        return self._rule_set
+    
+    def scan_manifests(self) -> List[Violation]:
         """掃描所有manifests並識別違規"""
-        violations = []
+        return list(self.iter_violations())
+    
+    def iter_violations(self) -> Iterator[Violation]:
+        """串流產出違規，記憶體用量與倉庫大小無關"""
+        for _, file_violations in self.iter_file_violations():
+            yield from file_violations
+    
+    def iter_file_violations(self) -> Iterator[Tuple[Path, List[Violation]]]:
+        """逐檔產出 (檔案, 違規清單)，順序與檔案清單一致"""
+        rules = self.get_rule_set()
+        self._check_routes = {}
+        # 每次掃描重新計時；check_timings 僅反映本次掃描（常駐服務直接呼叫 _scan_file，保留累計值）
+        self.check_stats = {}
+        self.namespace_teams = {}
+        all_files = self._iter_manifest_files()
+        manifest_files = self._select_scope(all_files) if self.changed_files is not None else all_files
+        self.scanned_files = manifest_files
+        
+        if self.async_pipeline:
+            per_file = self._iter_async_pipeline(manifest_files, rules)
+        elif self.cache is not None:
+            per_file = self._scan_files_cached(manifest_files, rules)
+        else:
+            per_file = self._scan_files(manifest_files, rules)
+        
+        for manifest_file, file_violations in zip(manifest_files, per_file):
+            if file_violations is None:
+                file_violations = FileViolations()
+            self.namespace_teams.update(file_violations.namespace_teams)
+            yield manifest_file, file_violations
+        
+        if self.cache is not None:
+            self.cache.prune([str(f) for f in all_files])
+            self.cache.save()
+    
+    async def scan_manifests_async(self) -> List[Violation]:
+        """asyncio 版本的 scan_manifests，回傳相同的違規清單"""
+        rules = self.get_rule_set()
+        self._check_routes = {}
+        self.check_stats = {}
+        self.namespace_teams = {}
+        all_files = self._iter_manifest_files()
+        manifest_files = self._select_scope(all_files) if self.changed_files is not None else all_files
+        self.scanned_files = manifest_files
+        
+        per_file: List[Optional[List[Violation]]] = [None] * len(manifest_files)
+        
+        def emit(item: Tuple[int, Optional[List[Violation]]]):
+            per_file[item[0]] = item[1]
+        
+        await self._run_async_pipeline(manifest_files, rules, emit)
+        if self.cache is not None:
+            self.cache.prune([str(f) for f in all_files])
+            self.cache.save()
+        for file_violations in per_file:
+            if file_violations is not None:
+                self.namespace_teams.update(file_violations.namespace_teams)
+        return [v for file_violations in per_file for v in (file_violations or [])]
+    
+    def _iter_async_pipeline(self, manifest_files: List[Path], rules: CompiledRuleSet) -> Iterator[Optional[List[Violation]]]:
+        """於背景執行緒執行非同步管線，結果經有界佇列送回，並以重排緩衝依檔案順序產出；
+        緩衝僅含管線中尚在處理的檔案，記憶體用量與檔案總數無關"""
+        results: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        done = object()
+        errors: List[BaseException] = []
         
-        for manifest_file in self.manifests_dir.rglob("*.yaml"):
-            if manifest_file.is_file():
+        def emit(item: Tuple[int, Optional[List[Violation]]]):
+            # 消費端提前結束時丟棄剩餘結果，讓管線自行跑完
+            while not stop.is_set():
                 try:
-                    with open(manifest_file, 'r') as f:
-                        manifests = list(yaml.safe_load_all(f))
-                    
-                    for i, manifest in enumerate(manifests):
-                        if manifest:
-                            file_violations = self._analyze_manifest(manifest, str(manifest_file), i)
-                            violations.extend(file_violations)
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        
+        def run():
+            try:
+                asyncio.run(self._run_async_pipeline(manifest_files, rules, emit))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                results.put(done)
+        
+        thread = threading.Thread(target=run, name="async-pipeline", daemon=True)
+        thread.start()
+        buffer: Dict[int, Optional[List[Violation]]] = {}
+        next_pos = 0
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                pos, file_violations = item
+                buffer[pos] = file_violations
+                while next_pos in buffer:
+                    yield buffer.pop(next_pos)
+                    next_pos += 1
+        finally:
+            stop.set()
+        thread.join()
+        if errors:
+            raise errors[0]
+    
+    async def _run_async_pipeline(self, manifest_files: List[Path], rules: CompiledRuleSet,
+                                  emit: Callable[[Tuple[int, Optional[List[Violation]]]], None]) -> None:
+        """三階段管線：非同步讀檔 -> 解析池 -> 分析；每個檔案以 emit((位置, 結果)) 回報一次（失敗為 None）"""
+        loop = asyncio.get_running_loop()
+        read_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = iter(enumerate(manifest_files))
+        parser_count = max(1, self.workers)
+        
+        async def read_stage():
+            for pos, manifest_file in pending:
+                try:
+                    data = await asyncio.to_thread(manifest_file.read_bytes)
+                except OSError as e:
+                    logger.error(f"讀取檔案 {manifest_file} 失敗: {e}")
+                    emit((pos, None))
+                    continue
+                digest = None
+                if self.cache is not None:
+                    digest = content_digest(data)
+                    cached = self.cache.get(str(manifest_file), digest, rules.fingerprint)
+                    if cached is not None:
+                        emit((pos, cached))
+                        continue
+                await read_queue.put((pos, manifest_file, data, digest))
+        
+        async def parse_stage(pool):
+            while True:
+                item = await read_queue.get()
+                if item is None:
+                    return
+                pos, manifest_file, data, digest = item
+                try:
+                    manifests = await loop.run_in_executor(pool, _parse_documents, data)
+                except Exception as e:
+                    logger.error(f"解析檔案 {manifest_file} 失敗: {e}")
+                    emit((pos, None))
+                    continue
+                await parse_queue.put((pos, manifest_file, manifests, digest))
+        
+        async def analyze_stage():
+            while True:
+                item = await parse_queue.get()
+                if item is None:
+                    return
+                pos, manifest_file, manifests, digest = item
+                try:
+                    file_violations = self._analyze_documents(manifests, manifest_file, rules)
                 except Exception as e:
                     logger.error(f"解析檔案 {manifest_file} 失敗: {e}")
+                    emit((pos, None))
+                    continue
+                if digest is not None:
+                    self.cache.put(str(manifest_file), digest, rules.fingerprint, file_violations)
+                emit((pos, file_violations))
+        
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else ThreadPoolExecutor(max_workers=1)
+        try:
+            analyzer = asyncio.create_task(analyze_stage())
+            parsers = [asyncio.create_task(parse_stage(pool)) for _ in range(parser_count)]
+            await asyncio.gather(*(read_stage() for _ in range(self.read_concurrency)))
+            for _ in parsers:
+                await read_queue.put(None)
+            await asyncio.gather(*parsers)
+            await parse_queue.put(None)
+            await analyzer
+        finally:
+            pool.shutdown()
+    
+    def _iter_manifest_files(self) -> List[Path]:
+        """建立檔案清單並列出待掃描的manifest檔案"""
+        self.inventory = build_file_inventory(self.manifests_dir, self.include, self.exclude)
+        return [record.path for record in self.inventory]
+    
+    def _select_scope(self, all_files: List[Path]) -> List[Path]:
+        """差異掃描：變更的manifest，加上依賴變更命名空間的工作負載"""
+        changed = {Path(p).resolve() for p in self.changed_files}
+        if (self.rules_dir / RULES_FILENAME).resolve() in changed:
+            logger.info("智能規則已變更，改為全量掃描")
+            return all_files
+        
+        selected = [f for f in all_files if f.resolve() in changed]
+        namespaces = set()
+        for manifest_file in selected:
+            try:
+                with open(manifest_file, 'r') as f:
+                    for manifest in safe_load_all(f):
+                        if manifest and manifest.get('kind') == 'Namespace':
+                            namespaces.add(str(manifest.get('metadata', {}).get('name', '')))
+            except Exception as e:
+                logger.error(f"解析檔案 {manifest_file} 失敗: {e}")
+        namespaces.discard('')
+        
+        if namespaces:
+            # 以文字預篩選引用這些命名空間的檔案，無需解析 YAML；
+            # 涵蓋區塊/序列項目（`- namespace:`）與流式映射（`{name: q, namespace: ns}`），值後可接註解或 `,` `}`
+            ns_pattern = re.compile(
+                rb'(?:^[ \t]*(?:-[ \t]+)*|[{,][ \t]*)(["\']?)namespace\1[ \t]*:[ \t]*(["\']?)(?:'
+                + b'|'.join(re.escape(n.encode('utf-8')) for n in sorted(namespaces))
+                + rb')\2[ \t]*(?:[,}#]|\r?$)', re.MULTILINE
+            )
+            selected_set = set(selected)
+            for manifest_file in all_files:
+                if manifest_file in selected_set:
+                    continue
+                try:
+                    if ns_pattern.search(manifest_file.read_bytes()):
+                        selected_set.add(manifest_file)
+                except OSError:
+                    continue
+            selected = [f for f in all_files if f in selected_set]
         
+        logger.info(f"差異掃描: {len(selected)}/{len(all_files)} 個檔案")
+        return selected
+    
+    def _scan_files(self, manifest_files: List[Path], rules: CompiledRuleSet) -> Iterator[Optional[List[Violation]]]:
+        """依設定串行或多進程掃描；結果順序與輸入檔案順序一致"""
+        if self.workers > 1 and len(manifest_files) > 1:
+            # executor.map 保持提交順序，結果與串行路徑一致
+            return self._scan_files_parallel(manifest_files, rules)
+        return (self._scan_file(manifest_file, rules) for manifest_file in manifest_files)
+    
+    def _scan_files_cached(self, manifest_files: List[Path], rules: CompiledRuleSet) -> Iterator[Optional[List[Violation]]]:
+        """增量掃描：僅重新分析內容雜湊或規則指紋變更的檔案"""
+        if self.workers <= 1:
+            for manifest_file in manifest_files:
+                digest, data, cached = self._lookup_cache(manifest_file, rules)
+                if cached is not None or digest is None:
+                    yield cached
+                    continue
+                file_violations = self._analyze_content(data, manifest_file, rules)
+                if file_violations is not None:
+                    self.cache.put(str(manifest_file), digest, rules.fingerprint, file_violations)
+                yield file_violations
+        else:
+            # 先比對雜湊（僅記錄是否命中），將未命中的檔案分派至進程池，再按原順序合併；
+            # 命中項於產出時才還原，記憶體不隨檔案數成長
+            plan = []
+            for manifest_file in manifest_files:
+                try:
+                    digest = content_digest(manifest_file.read_bytes())
+                except OSError as e:
+                    logger.error(f"讀取檔案 {manifest_file} 失敗: {e}")
+                    plan.append((manifest_file, None, False))
+                    continue
+                plan.append((manifest_file, digest, self.cache.match(str(manifest_file), digest, rules.fingerprint)))
+            miss_files = [f for f, digest, hit in plan if digest is not None and not hit]
+            miss_results = self._scan_files(miss_files, rules) if miss_files else iter(())
+            for manifest_file, digest, hit in plan:
+                if digest is None:
+                    yield None
+                    continue
+                if hit:
+                    yield self.cache.load(str(manifest_file))
+                    continue
+                file_violations = next(miss_results)
+                if file_violations is not None:
+                    self.cache.put(str(manifest_file), digest, rules.fingerprint, file_violations)
+                yield file_violations
+        
+        logger.info(f"掃描快取: 命中 {self.cache.hits}，未命中 {self.cache.misses}")
+    
+    def _lookup_cache(self, manifest_file: Path, rules: CompiledRuleSet):
+        """讀取檔案並查詢快取，回傳 (digest, data, cached)；讀取失敗時 digest 為 None"""
+        try:
+            data = manifest_file.read_bytes()
+        except OSError as e:
+            logger.error(f"讀取檔案 {manifest_file} 失敗: {e}")
+            return None, None, None
+        digest = content_digest(data)
+        return digest, data, self.cache.get(str(manifest_file), digest, rules.fingerprint)
+    
+    def _scan_file(self, manifest_file: Path, rules: CompiledRuleSet) -> Optional[List[Violation]]:
+        """解析並分析單個檔案；失敗時回傳 None"""
+        try:
+            data = manifest_file.read_bytes()
+        except OSError as e:
+            logger.error(f"讀取檔案 {manifest_file} 失敗: {e}")
+            return None
+        return self._analyze_content(data, manifest_file, rules)
+    
+    def _analyze_content(self, data: bytes, manifest_file: Path, rules: CompiledRuleSet) -> Optional[List[Violation]]:
+        """解析檔案內容並分析其中所有文件"""
+        try:
+            return self._analyze_documents(_parse_documents(data), manifest_file, rules)
+        except Exception as e:
+            logger.error(f"解析檔案 {manifest_file} 失敗: {e}")
+            return None
+    
+    def _analyze_documents(self, manifests: List[Any], manifest_file: Path, rules: CompiledRuleSet) -> FileViolations:
+        """分析已解析的所有文件，並記錄其中 Namespace 的 team 標籤"""
+        violations = FileViolations()
+        for i, manifest in enumerate(manifests):
+            if manifest:
+                violations.extend(self._analyze_manifest(manifest, str(manifest_file), i, rules))
+                if manifest.get('kind') == 'Namespace':
+                    metadata = manifest.get('metadata') or {}
+                    team = (metadata.get('labels') or {}).get('team')
+                    if metadata.get('name') is not None and team is not None:
+                        violations.namespace_teams[str(metadata['name'])] = str(team)
         return violations
     
-    def _analyze_manifest(self, manifest: Dict, file_path: str, index: int) -> List[Dict]:
+    def _scan_files_parallel(self, manifest_files: List[Path], rules: CompiledRuleSet) -> Iterator[Optional[List[Violation]]]:
+        """多進程掃描：按檔案分塊分派至進程池"""
+        chunk_size = self.chunk_size or max(1, len(manifest_files) // (self.workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_scan_worker,
+            initargs=(str(self.manifests_dir), str(self.rules_dir), rules.raw),
+        ) as executor:
+            results = executor.map(_scan_file_worker, manifest_files, chunksize=chunk_size)
+            for manifest_file, (file_violations, check_stats) in zip(manifest_files, results):
+                self._merge_check_stats(check_stats)
+                if file_violations:
+                    # 路徑表為各進程獨立，改指向本進程的檔案 id
+                    file_id = PATHS.id_for(str(manifest_file))
+                    for violation in file_violations:
+                        violation.file_id = file_id
+                yield file_violations
+    
+    def _analyze_manifest(self, manifest: Dict, file_path: str, index: int,
+                          rules: Optional[CompiledRuleSet] = None) -> List[Violation]:
         """分析單個manifest的合規性"""
         violations = []
-        rules = self.load_intelligence_rules()
-        
-        # 檢查鏡像安全性
-        if 'spec' in manifest and 'template' in manifest['spec']:
-            containers = manifest['spec']['template']['spec'].get('containers', [])
-            for container in containers:
-                image_violations = self._check_image_compliance(container['image'], rules, file_path, index)
-                violations.extend(image_violations)
-        
-        # 檢查命名空間標籤
-        if manifest.get('kind') == 'Namespace':
-            ns_violations = self._check_namespace_labels(manifest, rules, file_path, index)
-            violations.extend(ns_violations)
-        
-        # 檢查安全上下文
-        if 'spec' in manifest and 'template' in manifest['spec']:
-            security_violations = self._check_security_context(
-                manifest['spec']['template']['spec'], rules, file_path, index
-            )
-            violations.extend(security_violations)
+        if rules is None:
+            rules = self.get_rule_set()
+        
+        kind = manifest.get('kind')
+        doc_checks, container_checks = self._route_checks(kind)
+        for check in doc_checks:
+            violations.extend(self._run_check(check, manifest, rules, file_path, index))
+        
+        # 容器檢查：每個容器僅訪問一次
+        if container_checks:
+            pod_spec = extract_pod_spec(manifest)
+            if pod_spec is not None:
+                for field, i, container in iter_containers(pod_spec):
+                    for check in container_checks:
+                        violations.extend(self._run_check(check, container, rules, file_path, index, i, field))
+        
+        if violations:
+            metadata = manifest.get('metadata')
+            if isinstance(metadata, dict):
+                namespace = metadata.get('name') if kind == 'Namespace' else metadata.get('namespace')
+                if namespace is not None:
+                    namespace = sys.intern(str(namespace))
+                    for violation in violations:
+                        violation.namespace = namespace
         
         return violations
     
-    def _check_image_compliance(self, image: str, rules: Dict, file_path: str, index: int) -> List[Dict]:
+    def _route_checks(self, kind: Optional[str]) -> Tuple[List[ComplianceCheck], List[ComplianceCheck]]:
+        """依 kind 篩選適用的 (文件檢查, 容器檢查)，結果按 kind 快取"""
+        route = self._check_routes.get(kind)
+        if route is None:
+            applicable = [c for c in CHECK_REGISTRY if c.kinds is None or kind in c.kinds]
+            route = ([c for c in applicable if not c.per_container],
+                     [c for c in applicable if c.per_container])
+            self._check_routes[kind] = route
+        return route
+    
+    def _run_check(self, check: ComplianceCheck, target: Dict, *args) -> List[Violation]:
+        """執行單項檢查並記錄耗時；插件回傳的 dict 轉為 Violation"""
+        start = time.perf_counter()
+        result = [v if isinstance(v, Violation) else Violation.from_dict(v) for v in check.fn(self, target, *args)]
+        stats = self.check_stats.get(check.name)
+        if stats is None:
+            stats = self.check_stats[check.name] = {'calls': 0, 'seconds': 0.0, 'violations': 0}
+        stats['calls'] += 1
+        stats['seconds'] += time.perf_counter() - start
+        stats['violations'] += len(result)
+        return result
+    
+    def _merge_check_stats(self, check_stats: Dict[str, Dict[str, Any]]):
+        """合併工作進程回傳的檢查統計"""
+        for name, delta in check_stats.items():
+            stats = self.check_stats.setdefault(name, {'calls': 0, 'seconds': 0.0, 'violations': 0})
+            for key, value in delta.items():
+                stats[key] += value
+    
+    def check_timings(self) -> Dict[str, Dict[str, Any]]:
+        """按耗時排序的檢查統計，供報告輸出"""
+        return {
+            name: {'calls': stats['calls'], 'seconds': round(stats['seconds'], 6),
+                   'violations': stats['violations']}
+            for name, stats in sorted(self.check_stats.items(), key=lambda kv: kv[1]['seconds'], reverse=True)
+        }
+    
+    @compliance_check('image_compliance', per_container=True)
+    def _check_image_compliance(self, container: Dict, rules: CompiledRuleSet, file_path: str, index: int,
+                                container_index: int = 0, container_field: str = 'containers') -> List[Violation]:
         """檢查鏡像合規性"""
         violations = []
-        replacement_rules = rules.get('image_replacement', {})
-        
-        for pattern, rule in replacement_rules.items():
-            if re.match(pattern.replace('.*', '.*'), image):
-                violation = {
-                    'type': 'image_compliance',
-                    'file': file_path,
-                    'manifest_index': index,
-                    'current_value': image,
-                    'recommended_value': rule['target'],
-                    'risk_level': rule['risk'],
-                    'remediation_type': rule['remediation'],
-                    'justification': rule['justification'],
-                    'auto_fixable': rule['remediation'] == 'auto'
-                }
-                violations.append(violation)
-                break
+        image = container.get('image')
+        rule = rules.match_image(image) if isinstance(image, str) else None
+        
+        if rule is not None:
+            violation = Violation(
+                type=ViolationType.IMAGE_COMPLIANCE,
+                file_id=PATHS.id_for(file_path),
+                manifest_index=index,
+                container_field=container_field,
+                container_index=container_index,
+                current_value=image,
+                recommended_value=rule['target'],
+                risk_level=intern_enum(RiskLevel, rule['risk']),
+                remediation_type=intern_enum(RemediationType, rule['remediation']),
+                justification=rule.get('justification', ''),
+                auto_fixable=rule['remediation'] == 'auto'
+            )
+            violations.append(violation)
         
         return violations
     
-    def _check_namespace_labels(self, manifest: Dict, rules: Dict, file_path: str, index: int) -> List[Dict]:
+    @compliance_check('namespace_labels', kinds=('Namespace',))
+    def _check_namespace_labels(self, manifest: Dict, rules: CompiledRuleSet, file_path: str, index: int) -> List[Violation]:
         """檢查命名空間標籤合規性"""
         violations = []
-        labeling_rules = rules.get('namespace_labeling', {})
-        required_labels = labeling_rules.get('required_labels', [])
+        metadata = manifest.get('metadata') or {}
+        current_labels = metadata.get('labels') or {}
+        if rules.required_label_set.issubset(current_labels):
+            return violations
         
-        current_labels = manifest.get('metadata', {}).get('labels', {})
-        
-        for label in required_labels:
+        for label in rules.required_labels:
             if label not in current_labels:
-                violation = {
-                    'type': 'missing_namespace_label',
-                    'file': file_path, 
-                    'manifest_index': index,
-                    'missing_label': label,
-                    'risk_level': 'medium',
-                    'remediation_type': 'auto',
-                    'auto_fixable': True
-                }
+                # 僅能推導出標籤值時才可自動修復
+                value = rules.label_value(label, str(metadata.get('name', '')))
+                violation = Violation(
+                    type=ViolationType.MISSING_NAMESPACE_LABEL,
+                    file_id=PATHS.id_for(file_path),
+                    manifest_index=index,
+                    missing_label=label,
+                    recommended_value=value,
+                    risk_level=RiskLevel.MEDIUM,
+                    remediation_type=RemediationType.AUTO if value is not None else RemediationType.MANUAL,
+                    auto_fixable=value is not None
+                )
                 violations.append(violation)
         
         return violations
     
-    def _check_security_context(self, pod_spec: Dict, rules: Dict, file_path: str, index: int) -> List[Dict]:
-        """檢查安全上下文合規性"""
+    @compliance_check('security_context', per_container=True)
+    def _check_security_context(self, container: Dict, rules: CompiledRuleSet, file_path: str, index: int,
+                                container_index: int = 0, container_field: str = 'containers') -> List[Violation]:
+        """檢查單個容器的安全上下文合規性"""
         violations = []
-        security_rules = rules.get('security_context', {}).get('auto_fixes', {})
+        security_context = container.get('securityContext') or {}
         
-        # 檢查容器安全上下文
-        for i, container in enumerate(pod_spec.get('containers', [])):
-            security_context = container.get('securityContext', {})
-            
-            for key, expected_value in security_rules.items():
-                current_value = security_context.get(key)
-                if current_value != expected_value:
-                    violation = {
-                        'type': 'security_context',
-                        'file': file_path,
-                        'manifest_index': index,
-                        'container_index': i,
-                        'setting': key,
-                        'current_value': current_value,
-                        'recommended_value': expected_value,
-                        'risk_level': 'high',
-                        'remediation_type': 'auto',
-                        'auto_fixable': True
-                    }
-                    violations.append(violation)
+        for key, expected_value in rules.security_context.items():
+            current_value = security_context.get(key)
+            if current_value != expected_value:
+                violation = Violation(
+                    type=ViolationType.SECURITY_CONTEXT,
+                    file_id=PATHS.id_for(file_path),
+                    manifest_index=index,
+                    container_field=container_field,
+                    container_index=container_index,
+                    setting=key,
+                    current_value=current_value,
+                    recommended_value=expected_value,
+                    risk_level=RiskLevel.HIGH,
+                    remediation_type=RemediationType.AUTO,
+                    auto_fixable=True
+                )
+                violations.append(violation)
         
         return violations
     
-    def auto_remediate(self, violations: List[Dict]) -> List[Dict]:
-        """執行自動修復"""
+    def auto_remediate(self, violations: List[Violation], index: Optional[ViolationIndex] = None) -> List[Dict]:
+        """執行自動修復：每個彙總群組只決定一次修復方式，再按檔案分組，每個檔案僅讀寫一次"""
         applied_fixes = []
+        for file_id, file_fixes in self._fixes_by_file(violations, index).items():
+            file_path = PATHS.path(file_id)
+            try:
+                fixes = self._remediate_file(Path(file_path), file_fixes)
+                applied_fixes.extend(fixes)
+                if fixes:
+                    logger.info(f"自動修復成功: {len(fixes)} 項 in {file_path}")
+            except Exception as e:
+                logger.error(f"自動修復失敗 {file_path}: {e}")
         
-        for violation in violations:
-            if violation.get('auto_fixable', False):
-                try:
-                    fix_result = self._apply_fix(violation)
-                    if fix_result['success']:
-                        applied_fixes.append(fix_result)
-                        logger.info(f"自動修復成功: {violation['type']} in {violation['file']}")
-                except Exception as e:
-                    logger.error(f"自動修復失敗: {e}")
-        
         return applied_fixes
     
-    def _apply_fix(self, violation: Dict) -> Dict:
-        """應用單個修復"""
-        fix_methods = {
+    def plan_remediation(self, violations: List[Violation], index: Optional[ViolationIndex] = None) -> Dict[str, Any]:
+        """乾跑：於記憶體計算所有修復，產生 JSON Patch 操作與 unified diff，不寫入磁碟"""
+        files = []
+        for file_id, file_fixes in self._fixes_by_file(violations, index).items():
+            file_path = PATHS.path(file_id)
+            try:
+                content, patcher, fixes = self._patch_file(Path(file_path), file_fixes)
+            except Exception as e:
+                logger.error(f"修復規劃失敗 {file_path}: {e}")
+                continue
+            if not fixes:
+                continue
+            diff_path = self._diff_path(file_path)
+            diff = difflib.unified_diff(content.splitlines(keepends=True), patcher.render().splitlines(keepends=True),
+                                        fromfile=f"a/{diff_path}", tofile=f"b/{diff_path}")
+            # 與 diff/git 相同，以標記行表示檔案結尾缺少換行
+            diff = (line if line.endswith('\n') else line + '\n\\ No newline at end of file\n' for line in diff)
+            files.append({
+                'file': file_path,
+                # 套用前比對，避免覆寫規劃後已變更的檔案
+                'digest': content_digest(content.encode('utf-8')),
+                'operations': patcher.operations(),
+                'fixes': fixes,
+                'diff': ''.join(diff)
+            })
+        return {
+            'plan_version': REMEDIATION_PLAN_VERSION,
+            'created': self._get_timestamp(),
+            'fix_count': sum(len(entry['fixes']) for entry in files),
+            'files': files
+        }
+    
+    @staticmethod
+    def _diff_path(file_path: str) -> str:
+        """diff 標頭路徑：相對於目前目錄（git apply 於倉庫根目錄執行），目錄外的絕對路徑去除根前綴"""
+        path = Path(os.path.abspath(file_path))
+        try:
+            return path.relative_to(Path.cwd()).as_posix()
+        except ValueError:
+            return path.relative_to(path.anchor).as_posix()
+    
+    def apply_remediation_plan(self, plan: Dict[str, Any]) -> List[Dict]:
+        """套用 plan_remediation 產生的計畫；規劃後內容已變更的檔案略過"""
+        if plan.get('plan_version') != REMEDIATION_PLAN_VERSION:
+            raise ValueError(f"不支援的修復計畫版本: {plan.get('plan_version')}")
+        applied_fixes = []
+        for entry in plan.get('files', []):
+            file_path = Path(entry['file'])
+            try:
+                with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                    content = f.read()
+                if content_digest(content.encode('utf-8')) != entry['digest']:
+                    logger.warning(f"檔案於規劃後已變更，略過: {file_path}")
+                    continue
+                patcher = YamlPatcher(content, loader=SafeLoader)
+                for op in entry['operations']:
+                    patcher.set(op['document'], parse_path(op['path']), op['value'])
+                self._write_patched(file_path, content, patcher.render())
+                applied_fixes.extend(entry['fixes'])
+                logger.info(f"自動修復成功: {len(entry['fixes'])} 項 in {file_path}")
+            except Exception as e:
+                logger.error(f"自動修復失敗 {file_path}: {e}")
+        return applied_fixes
+    
+    def _fixes_by_file(self, violations: List[Violation],
+                       index: Optional[ViolationIndex] = None) -> Dict[int, List[Tuple[Violation, Callable]]]:
+        """按彙總群組選定修復方法，再依檔案分組（檔案保持首次出現順序）"""
+        fixable = [v for v in violations if v.auto_fixable]
+        if index is None:
+            index = ViolationIndex(fixable)
+        # 檔案依首次出現順序處理
+        by_file: Dict[int, List[Tuple[Violation, Callable]]] = {v.file_id: [] for v in fixable}
+        
+        for group in index:
+            if not group.auto_fixable:
+                continue
+            fix_method = self._fix_methods().get(group.type)
+            if fix_method is None:
+                logger.warning(f"不支持的修復類型: {group.type}（{group.count} 處）")
+                continue
+            for violation in group.members:
+                by_file.setdefault(violation.file_id, []).append((violation, fix_method))
+        
+        return {file_id: file_fixes for file_id, file_fixes in by_file.items() if file_fixes}
+    
+    def _remediate_file(self, file_path: Path, file_fixes: List[Tuple[Violation, Callable]]) -> List[Dict]:
+        """單檔讀取-修改-寫回：依文件索引與路徑局部修補，單一備份並以原子重新命名寫入"""
+        content, patcher, applied = self._patch_file(file_path, file_fixes)
+        if applied:
+            self._write_patched(file_path, content, patcher.render())
+        return applied
+    
+    def _patch_file(self, file_path: Path,
+                    file_fixes: List[Tuple[Violation, Callable]]) -> Tuple[str, YamlPatcher, List[Dict]]:
+        """讀取檔案並於記憶體中排入修補，回傳 (原內容, 修補引擎, 成功的修復)"""
+        # newline='' 保留原始換行（CRLF 不被轉譯），修補僅改動受影響範圍
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        patcher = YamlPatcher(content, loader=SafeLoader)
+        
+        applied = []
+        for violation, fix_method in file_fixes:
+            fix_result = self._apply_fix(patcher, violation, fix_method)
+            if fix_result['success']:
+                applied.append(fix_result)
+            else:
+                logger.warning(f"略過修復 {violation['type']} in {file_path}: {fix_result.get('error')}")
+        return content, patcher, applied
+    
+    @staticmethod
+    def _write_patched(file_path: Path, original: str, new_text: str):
+        """備份原內容後，寫入暫存檔並原子替換"""
+        backup_path = file_path.with_name(file_path.name + '.backup')
+        with open(backup_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(original)
+        
+        tmp_path = file_path.with_name(file_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(new_text)
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    
+    def _fix_methods(self) -> Dict[str, Callable[[YamlPatcher, Violation], Dict]]:
+        return {
             'image_compliance': self._fix_image_compliance,
             'missing_namespace_label': self._fix_namespace_label,
             'security_context': self._fix_security_context
         }
-        
-        fix_method = fix_methods.get(violation['type'])
-        if fix_method:
-            return fix_method(violation)
-        else:
+    
+    def _apply_fix(self, patcher: YamlPatcher, violation: Violation, fix_method: Optional[Callable] = None) -> Dict:
+        """於修補引擎上排入單個修復"""
+        if fix_method is None:
+            fix_method = self._fix_methods().get(violation['type'])
+        if not fix_method:
             return {'success': False, 'error': f"不支持的修復類型: {violation['type']}"}
+        try:
+            return fix_method(patcher, violation)
+        except YamlPatchError as e:
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def _container_path(patcher: YamlPatcher, violation: Violation) -> Tuple:
+        """violation 所指容器在文件中的路徑（依 kind 決定 Pod spec 位置）"""
+        kind = patcher.get(violation['manifest_index'], ('kind',), None)
+        return pod_spec_path(kind) + (violation.get('container_field', 'containers'),
+                                      violation.get('container_index', 0))
     
-    def _fix_image_compliance(self, violation: Dict) -> Dict:
+    def _fix_image_compliance(self, patcher: YamlPatcher, violation: Violation) -> Dict:
         """修復鏡像合規性"""
-        file_path = Path(violation['file'])
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
-        # 替換鏡像
         old_image = violation['current_value']
         new_image = violation['recommended_value']
-        fixed_content = content.replace(old_image, new_image)
-        
-        # 備份原檔案
-        backup_path = file_path.with_suffix('.yaml.backup')
-        with open(backup_path, 'w') as f:
-            f.write(content)
-        
-        # 寫入修復後內容
-        with open(file_path, 'w') as f:
-            f.write(fixed_content)
+        path = self._container_path(patcher, violation) + ('image',)
+        if patcher.get(violation['manifest_index'], path, None) != old_image:
+            return {'success': False, 'error': f"找不到鏡像 {old_image}"}
         
+        patcher.set(violation['manifest_index'], path, new_image)
         return {
             'success': True,
-            'file': str(file_path),
+            'file': violation['file'],
             'fix_type': 'image_replacement',
             'old_value': old_image,
             'new_value': new_image
         }
     
-    def _fix_namespace_label(self, violation: Dict) -> Dict:
+    def _fix_namespace_label(self, patcher: YamlPatcher, violation: Violation) -> Dict:
         """修復命名空間標籤"""
-        # 實現標籤自動添加邏輯
-        return {'success': True, 'fix_type': 'namespace_label_addition'}
+        label = violation['missing_label']
+        value = violation.get('recommended_value')
+        path = ('metadata', 'labels', label)
+        if value is None or patcher.get(violation['manifest_index'], path) is not MISSING:
+            return {'success': False, 'error': f"無法補全標籤 {label}"}
+        
+        patcher.set(violation['manifest_index'], path, value)
+        return {
+            'success': True,
+            'file': violation['file'],
+            'fix_type': 'namespace_label_addition',
+            'label': label,
+            'new_value': value
+        }
     
-    def _fix_security_context(self, violation: Dict) -> Dict:
+    def _fix_security_context(self, patcher: YamlPatcher, violation: Violation) -> Dict:
         """修復安全上下文"""
-        # 實現安全上下文自動修復邏輯  
-        return {'success': True, 'fix_type': 'security_context_update'}
+        container_path = self._container_path(patcher, violation)
+        if not isinstance(patcher.get(violation['manifest_index'], container_path, None), dict):
+            return {'success': False, 'error': "找不到容器"}
+        
+        path = container_path + ('securityContext', violation['setting'])
+        old_value = patcher.get(violation['manifest_index'], path, None)
+        patcher.set(violation['manifest_index'], path, violation['recommended_value'])
+        return {
+            'success': True,
+            'file': violation['file'],
+            'fix_type': 'security_context_update',
+            'setting': violation['setting'],
+            'old_value': old_value,
+            'new_value': violation['recommended_value']
+        }
+    
+    @staticmethod
+    def git_changed_files(base_ref: str, repo_dir: str = ".") -> List[str]:
+        """透過本地 git 取得相對 base_ref 的變更檔案（絕對路徑，不含已刪除檔案）"""
+        top = subprocess.run(
+            ["git", "-C", repo_dir, "rev-parse", "--show-toplevel"],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+        # 關閉 core.quotePath 並以 NUL 分隔，非 ASCII（如中文）檔名不被跳脫，與檔案清單路徑一致
+        diff = subprocess.run(
+            ["git", "-c", "core.quotePath=false", "-C", top, "diff", "--name-only", "-z", "--diff-filter=d",
+             f"{base_ref}...HEAD"],
+            check=True, capture_output=True
+        ).stdout
+        return [str(Path(top) / os.fsdecode(name)) for name in diff.split(b'\0') if name]
     
     def _get_fallback_rules(self) -> Dict:
         """備用規則（當智能規則載入失敗時使用）"""
@@ -236,7 +1114,17 @@ class IntelligentComplianceScanner:
                 }
             },
             'namespace_labeling': {
-                'required_labels': ['team', 'environment', 'lifecycle']
+                'required_labels': ['team', 'environment', 'lifecycle'],
+                'auto_generation': {
+                    'environment': {
+                        'patterns': {
+                            '.*-prod$': 'production',
+                            '.*-staging$': 'staging',
+                            '.*-dev$': 'development'
+                        }
+                    },
+                    'lifecycle': {'default': 'active'}
+                }
             },
             'security_context': {
                 'auto_fixes': {
@@ -246,63 +1134,505 @@ class IntelligentComplianceScanner:
             }
         }
     
-    def generate_compliance_report(self) -> Dict:
-        """生成合規報告"""
+    def generate_compliance_report(self, aggregate: bool = False, dry_run: bool = False) -> Dict:
+        """生成合規報告；aggregate 時以彙總群組取代逐筆明細，報告大小與不同問題數成正比。
+        dry_run 時不修改檔案，修復計畫存於 self.remediation_plan，分數以計畫修復數計算"""
         violations = self.scan_manifests()
-        fixes_applied = self.auto_remediate([v for v in violations if v.get('auto_fixable', False)])
+        index = ViolationIndex(violations)
+        table = ViolationTable.from_violations(violations, self.namespace_teams)
+        if dry_run:
+            self.remediation_plan = self.plan_remediation(violations, index)
+            fixes = [fix for entry in self.remediation_plan['files'] for fix in entry['fixes']]
+            fixes_applied = []
+        else:
+            fixes = fixes_applied = self.auto_remediate(violations, index)
         
+        # 僅在輸出時序列化為 dict
         report = {
             'scan_timestamp': self._get_timestamp(),
-            'total_manifests_scanned': len(list(self.manifests_dir.rglob("*.yaml"))),
+            'total_manifests_scanned': len(self.scanned_files),
             'violations_found': len(violations),
+            'distinct_violations': len(index),
             'auto_fixes_applied': len(fixes_applied),
-            'compliance_score': self._calculate_compliance_score(violations, fixes_applied),
-            'violation_details': violations,
-            'fix_details': fixes_applied,
-            'remaining_violations': [v for v in violations if not v.get('auto_fixable', False)]
+            'compliance_score': self._calculate_compliance_score(table, fixes),
+            'statistics': table.summary(),
         }
+        if dry_run:
+            report['dry_run'] = True
+            report['auto_fixes_planned'] = len(fixes)
+        if aggregate:
+            report.update({
+                'violation_groups': index.to_list(),
+                'fix_groups': self._aggregate_fixes(fixes),
+                'remaining_violation_groups': index.to_list(auto_fixable=False),
+            })
+        else:
+            report.update({
+                'violation_details': [v.to_dict() for v in violations],
+                'violation_groups': index.to_list(),
+                'fix_details': fixes,
+                'remaining_violations': [v.to_dict() for v in violations if not v.auto_fixable],
+            })
+        report['check_timings'] = self.check_timings()
         
         return report
     
+    @staticmethod
+    def _aggregate_fixes(fixes: List[Dict]) -> List[Dict]:
+        """合併相同內容的修復結果，附上次數與檔案清單"""
+        groups: Dict[str, Dict] = {}
+        for fix in fixes:
+            summary = {k: v for k, v in fix.items() if k not in ('success', 'file')}
+            key = json.dumps(summary, sort_keys=True, ensure_ascii=False)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {**summary, 'count': 0, 'files': []}
+            group['count'] += 1
+            if not group['files'] or group['files'][-1] != fix['file']:
+                group['files'].append(fix['file'])
+        return sorted(groups.values(), key=lambda g: g['count'], reverse=True)
+    
+    def write_violations_jsonl(self, output_path: str, remediate: bool = True) -> Dict:
+        """串流模式：邊掃描邊以 JSON Lines 寫出違規，最後追加一筆摘要記錄"""
+        scan_timestamp = self._get_timestamp()
+        total = auto_fixable = fixed = 0
+        
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for _, file_violations in self.iter_file_violations():
+                fixable = []
+                for violation in file_violations:
+                    out.write(json.dumps(violation.to_dict(), ensure_ascii=False) + '\n')
+                    if violation.auto_fixable:
+                        fixable.append(violation)
+                total += len(file_violations)
+                auto_fixable += len(fixable)
+                if remediate and fixable:
+                    fixed += len(self.auto_remediate(fixable))
+            
+            summary = {
+                'type': 'summary',
+                'scan_timestamp': scan_timestamp,
+                'total_manifests_scanned': len(self.scanned_files),
+                'violations_found': total,
+                'auto_fixes_applied': fixed,
+                'compliance_score': self._score_from_counts(total, auto_fixable, fixed),
+                'remaining_violations_count': total - auto_fixable,
+                'check_timings': self.check_timings()
+            }
+            out.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        
+        return summary
+    
+    def write_sharded_report(self, output_dir: str, shard_by: str = 'namespace', remediate: bool = True) -> Dict:
+        """分片輸出：掃描時即按命名空間寫入各分片 JSONL，最後寫出 index.json。
+        shard_by='team' 時 team 取自 Namespace 的 team 標籤，可能於稍後的檔案才出現，
+        故先按命名空間暫存，掃描結束後再併入各 team 分片"""
+        if shard_by not in ('namespace', 'team'):
+            raise ValueError(f"不支援的分片方式: {shard_by}")
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        spool_dir = out_dir if shard_by == 'namespace' else out_dir / '.spool'
+        spool_dir.mkdir(exist_ok=True)
+        writer = ShardWriter(spool_dir)
+        scan_timestamp = self._get_timestamp()
+        # 命名空間 -> [違規數, 可自動修復數]
+        counts: Dict[str, List[int]] = {}
+        total = auto_fixable = fixed = 0
+        
+        for _, file_violations in self.iter_file_violations():
+            fixable = []
+            for violation in file_violations:
+                namespace = violation.namespace or UNASSIGNED
+                writer.write(namespace, json.dumps(violation.to_dict(), ensure_ascii=False) + '\n')
+                stats = counts.setdefault(namespace, [0, 0])
+                stats[0] += 1
+                if violation.auto_fixable:
+                    stats[1] += 1
+                    fixable.append(violation)
+            total += len(file_violations)
+            auto_fixable += len(fixable)
+            if remediate and fixable:
+                fixed += len(self.auto_remediate(fixable))
+        writer.flush()
+        
+        shards: Dict[str, Dict[str, Any]] = {}
+        if shard_by == 'namespace':
+            for namespace, (count, fixable_count) in counts.items():
+                shards[namespace] = {'file': writer.files[namespace], 'violations': count, 'auto_fixable': fixable_count}
+        else:
+            team_files: Dict[str, str] = {}
+            for namespace, (count, fixable_count) in counts.items():
+                team = self.namespace_teams.get(namespace, UNASSIGNED) if namespace != UNASSIGNED else UNASSIGNED
+                shard = shards.get(team)
+                if shard is None:
+                    team_files[team] = ShardWriter.file_name(team)
+                    shard = shards[team] = {'file': team_files[team], 'violations': 0, 'auto_fixable': 0,
+                                            'namespaces': []}
+                    (out_dir / shard['file']).write_text('', encoding='utf-8')
+                shard['violations'] += count
+                shard['auto_fixable'] += fixable_count
+                shard['namespaces'].append(namespace)
+                with open(spool_dir / writer.files[namespace], 'rb') as src, \
+                        open(out_dir / shard['file'], 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+            shutil.rmtree(spool_dir)
+        
+        index_path = out_dir / 'index.json'
+        # 移除上次執行遺留、本次已不存在的分片
+        if index_path.exists():
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f).get('shards', {})
+                live = {shard['file'] for shard in shards.values()}
+                for shard in previous.values():
+                    name = shard.get('file') or ''
+                    # 僅刪除索引目錄內的分片檔
+                    if name and Path(name).name == name and name not in live and (out_dir / name).is_file():
+                        (out_dir / name).unlink()
+            except (OSError, ValueError) as e:
+                logger.warning(f"無法讀取既有分片索引 {index_path}: {e}")
+        
+        index = {
+            'shard_by': shard_by,
+            'scan_timestamp': scan_timestamp,
+            'total_manifests_scanned': len(self.scanned_files),
+            'violations_found': total,
+            'auto_fixes_applied': fixed,
+            'compliance_score': self._score_from_counts(total, auto_fixable, fixed),
+            'shards': dict(sorted(shards.items())),
+            'check_timings': self.check_timings()
+        }
+        tmp_path = index_path.with_name(index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+        return index
+    
     def _get_timestamp(self) -> str:
         from datetime import datetime
         return datetime.now().isoformat()
     
-    def _calculate_compliance_score(self, violations: List, fixes: List) -> float:
-        """計算合規分數"""
-        if not violations:
+    def _calculate_compliance_score(self, violations, fixes: List) -> float:
+        """計算合規分數；violations 可為違規清單或 ViolationTable"""
+        if not isinstance(violations, ViolationTable):
+            violations = ViolationTable.from_violations(violations)
+        return self._score_from_counts(len(violations), violations.fixable_count(), len(fixes))
+    
+    @staticmethod
+    def _score_from_counts(total: int, auto_fixable: int, fixed: int) -> float:
+        """由計數計算合規分數（供串流模式使用，無需保留違規清單）"""
+        if not total:
             return 100.0
         
-        auto_fixable = len([v for v in violations if v.get('auto_fixable', False)])
-        fixed = len(fixes)
-        
         if auto_fixable > 0:
             fix_rate = fixed / auto_fixable
-            remaining_non_auto = len(violations) - auto_fixable
-            base_score = 100 * (1 - remaining_non_auto / (len(violations) + 1))
+            remaining_non_auto = total - auto_fixable
+            base_score = 100 * (1 - remaining_non_auto / (total + 1))
             return round(base_score * fix_rate, 1)
         else:
-            return round(100 * (1 - len(violations) / (len(violations) + 10)), 1)
+            return round(100 * (1 - total / (total + 10)), 1)
+
+class ScannerDaemon:
+    """常駐掃描服務：於記憶體保留已編譯規則與各檔違規，輪詢變更並僅重掃變動檔案"""
+
+    def __init__(self, scanner: IntelligentComplianceScanner, poll_interval: float = 1.0):
+        self.scanner = scanner
+        self.poll_interval = poll_interval
+        self._stamps: Dict[Path, Tuple[int, float]] = {}
+        # 結果以解析後的絕對路徑為鍵，查詢時可使用相對、./ 前綴或絕對路徑
+        self._keys: Dict[Path, str] = {}
+        self._results: Dict[str, List[Violation]] = {}
+        self._order: List[str] = []
+        self._rules_fingerprint: Optional[str] = None
+        # 檢查統計快照：check_stats 僅由 refresh 寫入，report 讀取快照以免迭代中被修改
+        self._check_timings: Dict[str, Dict[str, Any]] = {}
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.last_refresh: Optional[str] = None
+
+    def refresh(self) -> Dict[str, int]:
+        """比對檔案清單的 (size, mtime)；規則變更時全量重掃，否則僅重掃變動檔案"""
+        with self._refresh_lock:
+            rules = self.scanner.get_rule_set()
+            full = rules.fingerprint != self._rules_fingerprint
+            inventory = build_file_inventory(self.scanner.manifests_dir, self.scanner.include, self.scanner.exclude)
+            stamps = {record.path: (record.size, record.mtime) for record in inventory}
+            changed = [path for path, stamp in stamps.items() if full or self._stamps.get(path) != stamp]
+            removed = [path for path in self._stamps if path not in stamps]
+            keys = {path: self._keys.get(path) or self._key(path) for path in stamps}
+            
+            updates = {}
+            for path in changed:
+                file_violations = self.scanner._scan_file(path, rules)
+                updates[keys[path]] = FileViolations() if file_violations is None else file_violations
+            check_timings = self.scanner.check_timings()
+            with self._state_lock:
+                for path in removed:
+                    self._results.pop(self._keys[path], None)
+                self._results.update(updates)
+                self._order = [keys[record.path] for record in inventory]
+                self._keys = keys
+                self._stamps = stamps
+                self._rules_fingerprint = rules.fingerprint
+                self._check_timings = check_timings
+                self.last_refresh = self.scanner._get_timestamp()
+            if changed or removed:
+                logger.info(f"增量重掃: 變更 {len(changed)}，移除 {len(removed)}")
+            return {'changed': len(changed), 'removed': len(removed)}
+
+    def report(self) -> Dict:
+        """目前的合規報告（唯讀，不執行修復）"""
+        with self._state_lock:
+            violations = [v for path in self._order for v in self._results.get(path, [])]
+            namespace_teams = {}
+            for path in self._order:
+                namespace_teams.update(getattr(self._results.get(path), 'namespace_teams', {}))
+            table = ViolationTable.from_violations(violations, namespace_teams)
+            report = {
+                'scan_timestamp': self.last_refresh,
+                'total_manifests_scanned': len(self._order),
+                'violations_found': len(table),
+                'auto_fixable': table.fixable_count(),
+                'statistics': table.summary(),
+                'violation_details': [v.to_dict() for v in violations],
+                'check_timings': self._check_timings
+            }
+        report['compliance_score'] = self.scanner._score_from_counts(len(violations), report['auto_fixable'], 0)
+        return report
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    def file_violations(self, file_path: str) -> Optional[List[Dict]]:
+        key = self._key(Path(file_path))
+        with self._state_lock:
+            violations = self._results.get(key)
+            return None if violations is None else [v.to_dict() for v in violations]
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"增量重掃失敗: {e}")
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+        """啟動輪詢執行緒並以 HTTP（TCP 或 Unix socket）提供報告"""
+        self.refresh()
+        watcher = threading.Thread(target=self._watch_loop, name="manifest-watch", daemon=True)
+        watcher.start()
+        server = _make_daemon_server(self, host, port, socket_path)
+        logger.info(f"掃描服務已啟動: {socket_path or f'http://{host}:{port}'}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    """GET /report、/violations?file=PATH、/healthz；任一路徑加 ?refresh=1 先同步重掃"""
+
+    daemon: ScannerDaemon = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if query.get('refresh') == ['1']:
+            self.daemon.refresh()
+        if url.path == '/report':
+            self._send(200, self.daemon.report())
+        elif url.path == '/violations' and 'file' in query:
+            violations = self.daemon.file_violations(query['file'][0])
+            if violations is None:
+                self._send(404, {'error': f"未追蹤的檔案: {query['file'][0]}"})
+            else:
+                self._send(200, violations)
+        elif url.path == '/healthz':
+            self._send(200, {'status': 'ok', 'last_refresh': self.daemon.last_refresh})
+        else:
+            self._send(404, {'error': f"未知路徑: {url.path}"})
+
+    def _send(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket 的 client_address 為空字串
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        self.socket.bind(self.server_address)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def _make_daemon_server(daemon: ScannerDaemon, host: str, port: int, socket_path: Optional[str]):
+    handler = type('DaemonRequestHandler', (_DaemonRequestHandler,), {'daemon': daemon})
+    if socket_path:
+        return _UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# 進程池工作者狀態（每個子進程各自持有一個掃描器與已編譯規則）
+_WORKER_SCANNER: Optional[IntelligentComplianceScanner] = None
+_WORKER_RULES: Optional[CompiledRuleSet] = None
+
+
+def _parse_documents(data: bytes) -> List[Any]:
+    """解析檔案內所有 YAML 文件（可於進程池中執行）"""
+    return list(safe_load_all(data))
+
+
+def _init_scan_worker(manifests_dir: str, rules_dir: str, raw_rules: Dict[str, Any]):
+    """進程池初始化：直接使用父進程已載入的規則，避免重複讀取規則檔"""
+    global _WORKER_SCANNER, _WORKER_RULES
+    _WORKER_SCANNER = IntelligentComplianceScanner(manifests_dir, rules_dir)
+    _WORKER_RULES = CompiledRuleSet(raw_rules)
+
+
+def _scan_file_worker(manifest_file: Path) -> Tuple[Optional[List[Violation]], Dict[str, Dict[str, Any]]]:
+    """回傳 (違規清單, 本次的檢查統計增量)"""
+    violations = _WORKER_SCANNER._scan_file(manifest_file, _WORKER_RULES)
+    check_stats, _WORKER_SCANNER.check_stats = _WORKER_SCANNER.check_stats, {}
+    return violations, check_stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令列參數"""
+    ap = argparse.ArgumentParser(description="智能合規掃描與自動修復引擎")
+    ap.add_argument("--manifests-dir", default="manifests", help="manifest 根目錄")
+    ap.add_argument("--rules-dir", default="skills/compliance-automation", help="智能規則目錄")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="掃描進程數（1 為串行，0 為全部 CPU 核心）")
+    ap.add_argument("--chunk-size", type=int, default=0,
+                    help="每次分派給工作進程的檔案數（0 為自動）")
+    ap.add_argument("--cache", default=None, metavar="PATH",
+                    help="增量掃描快取檔（例如 .compliance-scan-cache.json）")
+    ap.add_argument("--include", action="append", default=None, metavar="GLOB",
+                    help="納入掃描的檔案 glob，可重複指定（預設 *.yaml 與 *.yml）")
+    ap.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                    help="排除的相對路徑或檔名 glob，可重複指定")
+    ap.add_argument("--stream", default=None, metavar="PATH",
+                    help="以 JSON Lines 串流寫出違規與摘要，取代 compliance-report.json")
+    ap.add_argument("--shard-dir", default=None, metavar="DIR",
+                    help="分片輸出：每個命名空間或 team 一個 JSONL 檔，另附 index.json，取代 compliance-report.json")
+    ap.add_argument("--shard-by", choices=("namespace", "team"), default="namespace",
+                    help="分片依據：命名空間，或 Namespace 的 team 標籤")
+    ap.add_argument("--dry-run", action="store_true",
+                    help="不修改檔案：於記憶體計算修復並輸出計畫（見 --plan-out/--plan-format）")
+    ap.add_argument("--plan-out", default="remediation-plan.json", metavar="PATH",
+                    help="乾跑修復計畫輸出路徑")
+    ap.add_argument("--plan-format", choices=("json", "diff"), default="json",
+                    help="修復計畫格式：JSON Patch 操作集（可供 --apply-plan）或 unified diff")
+    ap.add_argument("--apply-plan", default=None, metavar="PATH",
+                    help="套用先前以 --dry-run 產生的 JSON 修復計畫後結束，不重新掃描")
+    ap.add_argument("--aggregate", action="store_true",
+                    help="報告僅輸出彙總群組（類型、對象、建議值、次數、檔案），不含逐筆明細")
+    ap.add_argument("--daemon", action="store_true",
+                    help="常駐模式：輪詢 manifests 與規則檔變更，以 HTTP 提供目前報告")
+    ap.add_argument("--listen", default="127.0.0.1:8765", metavar="HOST:PORT",
+                    help="常駐模式的 HTTP 監聽位址")
+    ap.add_argument("--socket", default=None, metavar="PATH",
+                    help="常駐模式改用 Unix socket 提供服務")
+    ap.add_argument("--poll-interval", type=float, default=1.0,
+                    help="常駐模式輪詢間隔秒數")
+    ap.add_argument("--async-pipeline", action="store_true",
+                    help="使用 asyncio 管線（非同步讀檔與解析池重疊 I/O 與 CPU）")
+    ap.add_argument("--read-concurrency", type=int, default=8,
+                    help="asyncio 管線的並行讀檔數")
+    scope = ap.add_mutually_exclusive_group()
+    scope.add_argument("--changed-files", nargs="+", default=None, metavar="PATH",
+                       help="僅掃描指定的變更檔案及其依賴")
+    scope.add_argument("--base-ref", default=None,
+                       help="僅掃描相對此 git ref 變更的檔案及其依賴")
+    # adaptive-workflow 會傳入 --segment/--strategy 等參數，此處忽略未知參數
+    args, _ = ap.parse_known_args(argv)
+    return args
+
 
 def main():
     """主執行函數"""
-    scanner = IntelligentComplianceScanner()
+    args = parse_args()
+    changed_files = args.changed_files
+    if args.base_ref:
+        changed_files = IntelligentComplianceScanner.git_changed_files(args.base_ref)
+    scanner = IntelligentComplianceScanner(
+        manifests_dir=args.manifests_dir,
+        rules_dir=args.rules_dir,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        cache_path=args.cache,
+        changed_files=changed_files,
+        include=args.include or DEFAULT_INCLUDE,
+        exclude=args.exclude,
+        async_pipeline=args.async_pipeline,
+        read_concurrency=args.read_concurrency,
+    )
+    
+    if args.daemon:
+        host, _, port = args.listen.rpartition(':')
+        ScannerDaemon(scanner, args.poll_interval).serve(host or "127.0.0.1", int(port), args.socket)
+        return
+    
+    if args.apply_plan:
+        with open(args.apply_plan, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        fixes = scanner.apply_remediation_plan(plan)
+        print(f"🔧 已套用修復計畫 {args.apply_plan}: {len(fixes)}/{plan.get('fix_count', 0)} 項")
+        return
     
     print("🔍 開始智能合規掃描...")
-    report = scanner.generate_compliance_report()
+    if args.stream:
+        # 串流與分片模式的乾跑僅略過修復，不產生計畫
+        report = scanner.write_violations_jsonl(args.stream, remediate=not args.dry_run)
+        output_path = args.stream
+    elif args.shard_dir:
+        report = scanner.write_sharded_report(args.shard_dir, args.shard_by, remediate=not args.dry_run)
+        output_path = os.path.join(args.shard_dir, 'index.json')
+    else:
+        report = scanner.generate_compliance_report(aggregate=args.aggregate, dry_run=args.dry_run)
+        output_path = 'compliance-report.json'
+        # 輸出詳細報告
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if scanner.remediation_plan is not None:
+            with open(args.plan_out, 'w', encoding='utf-8') as f:
+                if args.plan_format == 'diff':
+                    f.write(''.join(entry['diff'] for entry in scanner.remediation_plan['files']))
+                else:
+                    json.dump(scanner.remediation_plan, f, indent=2, ensure_ascii=False)
+            print(f"📝 修復計畫: {scanner.remediation_plan['fix_count']} 項，已保存至 {args.plan_out}")
     
     print(f"📊 合規報告:")
     print(f"   掃描時間: {report['scan_timestamp']}")
     print(f"   掃描檔案數: {report['total_manifests_scanned']}")
     print(f"   發現違規: {report['violations_found']} 個")
+    if 'distinct_violations' in report:
+        print(f"   不同問題: {report['distinct_violations']} 類")
     print(f"   自動修復: {report['auto_fixes_applied']} 個") 
     print(f"   合規分數: {report['compliance_score']}%")
     
-    # 輸出詳細報告
-    with open('compliance-report.json', 'w') as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
-    
-    print("✅ 合規掃描完成！報告已保存至 compliance-report.json")
+    print(f"✅ 合規掃描完成！報告已保存至 {output_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+緊湊違規記錄
+功能：以 __slots__ dataclass 取代逐筆 dict，列舉欄位共用同一物件，檔案路徑集中存放於路徑表；
+僅在輸出時序列化回原有 JSON 結構；欄式違規表提供單次歸約的統計
+"""
+
+import json
+import sys
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ViolationType(str, Enum):
+    IMAGE_COMPLIANCE = 'image_compliance'
+    MISSING_NAMESPACE_LABEL = 'missing_namespace_label'
+    SECURITY_CONTEXT = 'security_context'
+
+
+class RiskLevel(str, Enum):
+    CRITICAL = 'critical'
+    HIGH = 'high'
+    MEDIUM = 'medium'
+    LOW = 'low'
+
+
+class RemediationType(str, Enum):
+    AUTO = 'auto'
+    SEMI_AUTO = 'semi-auto'
+    MANUAL = 'manual'
+
+
+def intern_enum(enum_cls, value: Any):
+    """轉為列舉成員；規則或插件自訂的值則以 sys.intern 共用字串"""
+    if isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return sys.intern(str(value))
+
+
+class PathTable:
+    """檔案路徑表：每個路徑只保存一次，違規以整數 id 引用（每個進程各自一份）"""
+
+    __slots__ = ('_paths', '_ids')
+
+    def __init__(self):
+        self._paths: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def id_for(self, path: str) -> int:
+        file_id = self._ids.get(path)
+        if file_id is None:
+            file_id = self._ids[path] = len(self._paths)
+            self._paths.append(path)
+        return file_id
+
+    def path(self, file_id: int) -> str:
+        return self._paths[file_id]
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+PATHS = PathTable()
+
+# 各類型輸出時的鍵與順序（與原 dict 結構一致）
+_LAYOUTS: Dict[Any, Tuple[str, ...]] = {
+    ViolationType.IMAGE_COMPLIANCE: (
+        'type', 'file', 'manifest_index', 'namespace', 'container_field', 'container_index', 'current_value',
+        'recommended_value', 'risk_level', 'remediation_type', 'justification', 'auto_fixable'
+    ),
+    ViolationType.MISSING_NAMESPACE_LABEL: (
+        'type', 'file', 'manifest_index', 'namespace', 'missing_label', 'recommended_value',
+        'risk_level', 'remediation_type', 'auto_fixable'
+    ),
+    ViolationType.SECURITY_CONTEXT: (
+        'type', 'file', 'manifest_index', 'namespace', 'container_field', 'container_index', 'setting',
+        'current_value', 'recommended_value', 'risk_level', 'remediation_type', 'auto_fixable'
+    ),
+}
+# 彙總鍵中代表「問題對象」的欄位：鏡像、設定項或缺少的標籤
+_GROUP_SUBJECTS: Dict[Any, str] = {
+    ViolationType.IMAGE_COMPLIANCE: 'current_value',
+    ViolationType.MISSING_NAMESPACE_LABEL: 'missing_label',
+    ViolationType.SECURITY_CONTEXT: 'setting',
+}
+_BASE_KEYS = ('type', 'file', 'manifest_index', 'risk_level', 'remediation_type', 'auto_fixable')
+_OPTIONAL_KEYS = ('namespace', 'container_field', 'container_index', 'setting', 'missing_label',
+                  'current_value', 'recommended_value', 'justification')
+
+
+@dataclass(slots=True)
+class Violation:
+    """單筆違規；支援唯讀的 dict 式存取（v['file']、v.get(...)）以相容既有呼叫端"""
+    type: Union[ViolationType, str]
+    file_id: int
+    manifest_index: int
+    risk_level: Union[RiskLevel, str]
+    remediation_type: Union[RemediationType, str]
+    auto_fixable: bool
+    # 所屬命名空間（Namespace 本身為其名稱）；未指定時為 None
+    namespace: Optional[str] = None
+    container_field: Optional[str] = None
+    container_index: Optional[int] = None
+    setting: Optional[str] = None
+    missing_label: Optional[str] = None
+    current_value: Any = None
+    recommended_value: Any = None
+    justification: Optional[str] = None
+    # 插件自訂、無對應欄位的鍵
+    extra: Optional[Dict[str, Any]] = None
+
+    @property
+    def file(self) -> str:
+        return PATHS.path(self.file_id)
+
+    def _layout(self) -> Tuple[str, ...]:
+        layout = _LAYOUTS.get(self.type)
+        if layout is None:
+            layout = _BASE_KEYS + tuple(k for k in _OPTIONAL_KEYS if getattr(self, k) is not None)
+        return layout
+
+    def _value(self, key: str) -> Any:
+        if key == 'file':
+            return self.file
+        value = getattr(self, key)
+        return value.value if isinstance(value, Enum) else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化為原有的 JSON 結構"""
+        out = {key: self._value(key) for key in self._layout()}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Violation':
+        known = {'file', 'type', 'manifest_index', 'risk_level', 'remediation_type', 'auto_fixable', *_OPTIONAL_KEYS}
+        extra = {k: v for k, v in data.items() if k not in known}
+        return cls(
+            type=intern_enum(ViolationType, data['type']),
+            file_id=PATHS.id_for(data['file']),
+            manifest_index=data.get('manifest_index', 0),
+            risk_level=intern_enum(RiskLevel, data.get('risk_level', 'medium')),
+            remediation_type=intern_enum(RemediationType, data.get('remediation_type', 'manual')),
+            auto_fixable=bool(data.get('auto_fixable', False)),
+            namespace=data.get('namespace'),
+            container_field=data.get('container_field'),
+            container_index=data.get('container_index'),
+            setting=data.get('setting'),
+            missing_label=data.get('missing_label'),
+            current_value=data.get('current_value'),
+            recommended_value=data.get('recommended_value'),
+            justification=data.get('justification'),
+            extra=extra or None,
+        )
+
+    def group_key(self) -> Tuple[Any, Any, Any]:
+        """彙總鍵：(類型, 鏡像/設定項/標籤, 建議值)"""
+        subject = getattr(self, _GROUP_SUBJECTS.get(self.type, 'current_value'))
+        return self.type, _hashable(subject), _hashable(self.recommended_value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._layout():
+            return self._value(key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._layout() or bool(self.extra and key in self.extra)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class FileViolations(list):
+    """單檔違規清單；namespace_teams 記錄檔案內 Namespace 宣告的 team 標籤（命名空間 -> team）"""
+
+    def __init__(self, violations: Iterable[Violation] = (), namespace_teams: Optional[Dict[str, str]] = None):
+        super().__init__(violations)
+        self.namespace_teams: Dict[str, str] = namespace_teams or {}
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+@dataclass(slots=True)
+class ViolationGroup:
+    """同一問題的所有實例：出現次數、涉及檔案（id -> 次數）與成員違規"""
+    type: Union[ViolationType, str]
+    subject_field: str
+    subject: Any
+    recommended_value: Any
+    risk_level: Union[RiskLevel, str]
+    remediation_type: Union[RemediationType, str]
+    auto_fixable: bool
+    count: int = 0
+    files: Dict[int, int] = field(default_factory=dict)
+    members: List[Violation] = field(default_factory=list)
+
+    @classmethod
+    def from_violation(cls, violation: Violation) -> 'ViolationGroup':
+        subject_field = _GROUP_SUBJECTS.get(violation.type, 'current_value')
+        return cls(violation.type, subject_field, getattr(violation, subject_field), violation.recommended_value,
+                   violation.risk_level, violation.remediation_type, violation.auto_fixable)
+
+    def add(self, violation: Violation) -> None:
+        self.count += 1
+        self.files[violation.file_id] = self.files.get(violation.file_id, 0) + 1
+        self.members.append(violation)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'type': getattr(self.type, 'value', self.type),
+            self.subject_field: self.subject,
+            'recommended_value': self.recommended_value,
+            'risk_level': getattr(self.risk_level, 'value', self.risk_level),
+            'remediation_type': getattr(self.remediation_type, 'value', self.remediation_type),
+            'auto_fixable': self.auto_fixable,
+            'count': self.count,
+            'files': [PATHS.path(file_id) for file_id in self.files],
+        }
+
+
+class ViolationIndex:
+    """彙總索引：以 group_key 合併重複違規，群組保持首次出現順序"""
+
+    __slots__ = ('groups',)
+
+    def __init__(self, violations: Iterable[Violation] = ()):
+        self.groups: Dict[Tuple[Any, Any, Any], ViolationGroup] = {}
+        for violation in violations:
+            self.add(violation)
+
+    def add(self, violation: Violation) -> ViolationGroup:
+        key = violation.group_key()
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = ViolationGroup.from_violation(violation)
+        group.add(violation)
+        return group
+
+    def __iter__(self) -> Iterator[ViolationGroup]:
+        return iter(self.groups.values())
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def to_list(self, auto_fixable: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """依出現次數遞減輸出；auto_fixable 指定時僅輸出對應群組"""
+        groups = [g for g in self if auto_fixable is None or g.auto_fixable == auto_fixable]
+        return [g.to_dict() for g in sorted(groups, key=lambda g: g.count, reverse=True)]
+
+
+UNASSIGNED = '(none)'
+
+
+class _Vocabulary:
+    """欄位值 <-> 整數代碼"""
+
+    __slots__ = ('labels', 'codes')
+
+    def __init__(self):
+        self.labels: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def code(self, label: Any) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class ViolationTable:
+    """欄式違規表：類型、風險、可修復、檔案 id、命名空間、team 各存為一個 array；
+    統計先以單次歸約得出欄位組合計數，各項分佈再由組合計數彙總（有 NumPy 時以 np.unique 歸約）"""
+
+    __slots__ = ('type', 'risk_level', 'auto_fixable', 'file_id', 'namespace', 'team', '_vocab', '_combos')
+
+    _CODED = ('type', 'risk_level', 'namespace', 'team')
+
+    def __init__(self):
+        self._vocab = {column: _Vocabulary() for column in self._CODED}
+        self.type = array('I')
+        self.risk_level = array('I')
+        self.namespace = array('I')
+        self.team = array('I')
+        self.auto_fixable = array('B')
+        self.file_id = array('I')
+        self._combos: Optional[Counter] = None
+
+    @classmethod
+    def from_violations(cls, violations: Iterable[Violation],
+                        namespace_teams: Optional[Dict[str, str]] = None) -> 'ViolationTable':
+        table = cls()
+        teams = namespace_teams or {}
+        for violation in violations:
+            table.append(violation, teams.get(violation.namespace))
+        return table
+
+    def append(self, violation: Violation, team: Optional[str] = None) -> None:
+        vocab = self._vocab
+        self.type.append(vocab['type'].code(getattr(violation.type, 'value', violation.type)))
+        self.risk_level.append(vocab['risk_level'].code(getattr(violation.risk_level, 'value', violation.risk_level)))
+        self.namespace.append(vocab['namespace'].code(violation.namespace or UNASSIGNED))
+        self.team.append(vocab['team'].code(team or UNASSIGNED))
+        self.auto_fixable.append(1 if violation.auto_fixable else 0)
+        self.file_id.append(violation.file_id)
+        self._combos = None
+
+    def __len__(self) -> int:
+        return len(self.type)
+
+    def combination_counts(self) -> Counter:
+        """(類型, 風險, 命名空間, team, 可修復) 代碼組合 -> 次數；單次遍歷所有欄"""
+        if self._combos is None:
+            columns = (self.type, self.risk_level, self.namespace, self.team, self.auto_fixable)
+            if np is not None and len(self):
+                stacked = np.stack([np.frombuffer(c, dtype=c.typecode).astype(np.int64) for c in columns])
+                keys, counts = np.unique(stacked, axis=1, return_counts=True)
+                self._combos = Counter({tuple(int(k) for k in keys[:, i]): int(n) for i, n in enumerate(counts)})
+            else:
+                self._combos = Counter(zip(*columns))
+        return self._combos
+
+    def fixable_count(self) -> int:
+        return sum(n for combo, n in self.combination_counts().items() if combo[4])
+
+    def histogram(self, column: str) -> Dict[str, int]:
+        """單欄分佈（type / risk_level / namespace / team），依次數遞減"""
+        position = self._CODED.index(column)
+        labels = self._vocab[column].labels
+        counts: Counter = Counter()
+        for combo, n in self.combination_counts().items():
+            counts[labels[combo[position]]] += n
+        return dict(counts.most_common())
+
+    def breakdown(self, by: str) -> Dict[str, Dict[str, Any]]:
+        """按命名空間或 team 分組：違規數、可自動修復數與風險、類型分佈"""
+        position = self._CODED.index(by)
+        labels = {column: self._vocab[column].labels for column in self._CODED}
+        groups: Dict[str, Dict[str, Any]] = {}
+        for combo, n in self.combination_counts().items():
+            group = groups.setdefault(labels[by][combo[position]],
+                                      {'violations': 0, 'auto_fixable': 0, 'by_risk': {}, 'by_type': {}})
+            group['violations'] += n
+            group['auto_fixable'] += n if combo[4] else 0
+            risk = labels['risk_level'][combo[1]]
+            group['by_risk'][risk] = group['by_risk'].get(risk, 0) + n
+            kind = labels['type'][combo[0]]
+            group['by_type'][kind] = group['by_type'].get(kind, 0) + n
+        return dict(sorted(groups.items(), key=lambda kv: kv[1]['violations'], reverse=True))
+
+    def summary(self) -> Dict[str, Any]:
+        """整體與分組統計，供報告輸出"""
+        return {
+            'violations': len(self),
+            'auto_fixable': self.fixable_count(),
+            'files': len(set(self.file_id)),
+            'by_risk': self.histogram('risk_level'),
+            'by_type': self.histogram('type'),
+            'by_namespace': self.breakdown('namespace'),
+            'by_team': self.breakdown('team'),
+        }
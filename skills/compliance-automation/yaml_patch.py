@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+結構感知的 YAML 修補引擎
+功能：依文件索引與路徑定位節點，僅改寫受影響的字元範圍，保留註解與原有格式
+"""
+
+import functools
+import json
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import yaml
+from yaml.constructor import SafeConstructor
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+PathKey = Union[str, int]
+NULL_TAG = 'tag:yaml.org,2002:null'
+MISSING = object()
+
+
+class YamlPatchError(Exception):
+    """路徑無法定位或結構不支援修補"""
+
+
+class _NewMapping(dict):
+    """修補過程中新建立的中間映射（區別於使用者指定的 dict 值）"""
+
+
+def format_path(path: Sequence[PathKey]) -> str:
+    """將路徑轉為 JSON Pointer（RFC 6901）"""
+    return '/' + '/'.join(str(p).replace('~', '~0').replace('/', '~1') for p in path)
+
+
+def parse_path(pointer: str) -> List[str]:
+    """format_path 的反向；序列索引保留為數字字串，由 YamlPatcher 依節點類型解讀"""
+    if not pointer.startswith('/'):
+        raise YamlPatchError(f"無效的 JSON Pointer: {pointer}")
+    return [p.replace('~1', '/').replace('~0', '~') for p in pointer[1:].split('/')]
+
+
+def format_scalar(value: Any, style: str = None) -> str:
+    """將值序列化為單行 YAML；字串沿用原節點的引號風格"""
+    if isinstance(value, str) and style == '"':
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and style == "'":
+        return "'" + value.replace("'", "''") + "'"
+    try:
+        return _dump_flow(value)
+    except TypeError:
+        # 不可雜湊的值（dict/list）不經快取
+        return _dump_flow.__wrapped__(value)
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _dump_flow(value: Any) -> str:
+    """序列化結果以值快取：同一彙總群組的修復值僅序列化一次"""
+    text = yaml.safe_dump(value, default_flow_style=True, allow_unicode=True, width=float('inf'))
+    if text.endswith('\n...\n'):
+        text = text[:-len('\n...\n')]
+    return text.rstrip('\n')
+
+
+def _render_flow(tree: Dict) -> str:
+    return ', '.join(
+        f"{format_scalar(k)}: {{{_render_flow(v)}}}" if isinstance(v, _NewMapping)
+        else f"{format_scalar(k)}: {format_scalar(v)}"
+        for k, v in tree.items()
+    )
+
+
+def _render_block(tree: Dict, indent: int) -> str:
+    lines = []
+    for key, value in tree.items():
+        if isinstance(value, _NewMapping):
+            lines.append(f"{' ' * indent}{format_scalar(key)}:\n{_render_block(value, indent + 2)}")
+        else:
+            lines.append(f"{' ' * indent}{format_scalar(key)}: {format_scalar(value)}\n")
+    return ''.join(lines)
+
+
+class YamlPatcher:
+    """以 compose 取得節點位置，累積修補後一次性輸出新文字"""
+
+    def __init__(self, text: str, loader=yaml.SafeLoader):
+        self.text = text
+        # 新插入的行沿用原文件的換行風格
+        self.newline = '\r\n' if '\r\n' in text else '\n'
+        self.documents: List[Node] = list(yaml.compose_all(text, Loader=loader))
+        self._replacements: Dict[int, Tuple[ScalarNode, Any]] = {}
+        # 需插入新鍵的既有節點：id(node) -> (node, 待建立的子樹)
+        self._inserts: Dict[int, Tuple[Node, _NewMapping]] = {}
+        self._constructor = SafeConstructor()
+        # 依呼叫順序記錄的修補操作（JSON Patch 形式），供乾跑計畫輸出
+        self._operations: List[Dict[str, Any]] = []
+
+    def _document(self, index: int) -> Node:
+        try:
+            return self.documents[index]
+        except IndexError:
+            raise YamlPatchError(f"文件索引超出範圍: {index}")
+
+    @staticmethod
+    def _child(node: Node, key: PathKey):
+        if isinstance(node, MappingNode):
+            for key_node, value_node in node.value:
+                if isinstance(key_node, ScalarNode) and key_node.value == str(key):
+                    return value_node
+            return None
+        if isinstance(node, SequenceNode) and isinstance(key, str) and key.isdigit():
+            key = int(key)
+        if isinstance(node, SequenceNode) and isinstance(key, int) and 0 <= key < len(node.value):
+            return node.value[key]
+        return None
+
+    def get(self, document: int, path: Sequence[PathKey], default: Any = MISSING) -> Any:
+        """讀取原始文字中路徑所指的值"""
+        node = self._document(document)
+        for key in path:
+            node = self._child(node, key)
+            if node is None:
+                return default
+        return self._constructor.construct_object(node, deep=True)
+
+    def set(self, document: int, path: Sequence[PathKey], value: Any) -> None:
+        """排入一個修補：路徑存在則替換純量，否則於最近的既有映射插入缺少的鍵"""
+        if not path:
+            raise YamlPatchError("路徑不可為空")
+        node = self._document(document)
+        for depth, key in enumerate(path):
+            child = self._child(node, key)
+            if child is None:
+                if isinstance(node, MappingNode) and isinstance(key, str):
+                    self._queue_insert(node, path[depth:], value)
+                    self._record('add', document, path, value)
+                    return
+                raise YamlPatchError(f"無法定位 {format_path(path[:depth + 1])}")
+            if depth == len(path) - 1:
+                if not isinstance(child, ScalarNode):
+                    raise YamlPatchError(f"僅支援替換純量值: {format_path(path)}")
+                self._replacements[id(child)] = (child, value)
+                self._record('replace', document, path, value)
+                return
+            if isinstance(child, ScalarNode) and child.tag == NULL_TAG:
+                # 空值（如 `labels:`）以新映射填入
+                self._queue_insert(child, path[depth + 1:], value)
+                self._record('add', document, path, value)
+                return
+            node = child
+
+    def _record(self, op: str, document: int, path: Sequence[PathKey], value: Any) -> None:
+        self._operations.append({'op': op, 'document': document, 'path': format_path(path), 'value': value})
+
+    def operations(self) -> List[Dict[str, Any]]:
+        """已排入的修補操作：{op, document, path(JSON Pointer), value}"""
+        return list(self._operations)
+
+    def _queue_insert(self, node: Node, path: Sequence[PathKey], value: Any) -> None:
+        _, tree = self._inserts.setdefault(id(node), (node, _NewMapping()))
+        for key in path[:-1]:
+            if not isinstance(key, str):
+                raise YamlPatchError(f"無法建立序列索引 {key}")
+            sub = tree.get(key)
+            if not isinstance(sub, _NewMapping):
+                sub = tree[key] = _NewMapping()
+            tree = sub
+        tree[path[-1]] = value
+
+    def _content_end(self, node: Node) -> int:
+        """節點最後一個內容字元之後的位置（區塊集合的 end_mark 會越過尾隨註解）"""
+        if isinstance(node, (MappingNode, SequenceNode)) and not node.flow_style and node.value:
+            last = node.value[-1]
+            return self._content_end(last[1] if isinstance(node, MappingNode) else last)
+        end = node.end_mark.index
+        if isinstance(node, ScalarNode) and node.style in ('|', '>'):
+            while end > node.start_mark.index and self.text[end - 1] in '\r\n':
+                end -= 1
+        return end
+
+    def _insert_edit(self, node: Node, tree: _NewMapping) -> Tuple[int, int, str, int]:
+        if isinstance(node, ScalarNode):
+            # 空值節點：替換為流式映射
+            text = self.text[node.start_mark.index:node.end_mark.index]
+            prefix = ' ' if not text else ''
+            return node.start_mark.index, node.end_mark.index, f"{prefix}{{{_render_flow(tree)}}}", 0
+        if node.flow_style or not node.value:
+            if node.value:
+                pos = self._content_end(node.value[-1][1])
+                return pos, pos, f", {_render_flow(tree)}", 0
+            pos = self.text.rindex('}', node.start_mark.index, node.end_mark.index)
+            return pos, pos, _render_flow(tree), 0
+        indent = node.value[0][0].start_mark.column
+        end = self._content_end(node)
+        newline = self.text.find('\n', end)
+        if newline == -1:
+            return len(self.text), len(self.text), '\n' + _render_block(tree, indent), indent
+        return newline + 1, newline + 1, _render_block(tree, indent), indent
+
+    def edits(self) -> List[Tuple[int, int, str]]:
+        """回傳已排序的 (起點, 終點, 新文字) 編輯清單"""
+        edits = []
+        for node, value in self._replacements.values():
+            text = format_scalar(value, node.style)
+            if node.style in ('|', '>'):
+                text += '\n'
+            edits.append((node.start_mark.index, node.end_mark.index, text, 0))
+        for node, tree in self._inserts.values():
+            edits.append(self._insert_edit(node, tree))
+        # 同一位置的插入：縮排較深者（內層映射）在前
+        edits.sort(key=lambda e: (e[0], e[1], -e[3]))
+        return [(start, end, text) for start, end, text, _ in edits]
+
+    def render(self) -> str:
+        """套用所有修補並回傳新文字"""
+        pieces = []
+        cursor = 0
+        for start, end, text in self.edits():
+            if start < cursor:
+                raise YamlPatchError(f"修補範圍重疊於位置 {start}")
+            pieces.append(self.text[cursor:start])
+            pieces.append(text if self.newline == '\n' else text.replace('\n', self.newline))
+            cursor = end
+        pieces.append(self.text[cursor:])
+        return ''.join(pieces)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._replacements or self._inserts)